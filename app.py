@@ -15,23 +15,27 @@ Changes from v5:
   - Pending reviews retained for manual corrections only
 """
 
+import io
 import os
+import shutil
 import tempfile
-import atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from string import Template
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.graph_objects as go
 
 from lab_extractor import (
     process_pdf, save_report, load_history, generate_trends,
-    get_test_timeseries, list_patients, is_duplicate_file,
+    get_test_timeseries, list_patients, is_duplicate_file, file_hash,
     delete_patient, delete_report_by_date, rename_patient,
-    merge_into_patient, patch_record, STORE_DIR, BIOMARKERS,
+    merge_into_patient, patch_record, store_version, STORE_DIR, BIOMARKERS,
 )
 from llm_verifier import (
     save_pending_review, load_pending_reviews, delete_pending_review,
+    delete_pending_reviews, pending_version,
 )
 
 # ─────────────────────────────────────────────
@@ -68,221 +72,20 @@ RED_Z    = "rgba(249,123,90,0.08)"
 
 # ─────────────────────────────────────────────
 # CUSTOM CSS
+# Built once per process; still emitted on every run because Streamlit drops
+# any element a rerun does not re-send, so a session-state guard would unstyle
+# the page after the first interaction.
 # ─────────────────────────────────────────────
-st.markdown(f"""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=DM+Sans:wght@300;400;500;600;700&family=DM+Mono:wght@400;500&display=swap');
-
-/* ── Base ── */
-html, body, .stApp {{
-  background-color: {BG} !important;
-  color: {TEXT} !important;
-  font-family: 'DM Sans', sans-serif !important;
-}}
-
-/* ── Sidebar ── */
-section[data-testid="stSidebar"] {{
-  background-color: {SURFACE} !important;
-  border-right: 1px solid {BORDER} !important;
-}}
-section[data-testid="stSidebar"] p,
-section[data-testid="stSidebar"] span,
-section[data-testid="stSidebar"] label,
-section[data-testid="stSidebar"] div {{
-  color: {TEXT} !important;
-}}
-
-/* ── Main content background ── */
-[data-testid="stAppViewContainer"],
-[data-testid="stAppViewBlockContainer"],
-[data-testid="stMainBlockContainer"],
-section[data-testid="stMain"] {{
-  background-color: {BG} !important;
-}}
-
-/* ── Typography ── */
-p, label, h1, h2, h3, h4, h5, h6 {{
-  color: {TEXT} !important;
-  font-family: 'DM Sans', sans-serif !important;
-}}
-
-/* ── Tabs — fix overlap by ensuring overflow visible and no position conflicts ── */
-.stTabs [data-baseweb="tab-list"] {{
-  border-bottom: 1px solid {BORDER} !important;
-  background: transparent !important;
-  gap: 0 !important;
-  overflow: visible !important;
-}}
-.stTabs [data-baseweb="tab"] {{
-  background: transparent !important;
-  border-radius: 0 !important;
-  color: {MUTED} !important;
-  font-size: 0.82rem !important;
-  font-weight: 500 !important;
-  padding: 0.6rem 1.2rem !important;
-  border-bottom: 2px solid transparent !important;
-  overflow: visible !important;
-  position: static !important;
-}}
-.stTabs [aria-selected="true"] {{
-  color: {TEXT} !important;
-  border-bottom: 2px solid {ACCENT} !important;
-}}
-.stTabs [data-baseweb="tab-panel"] {{
-  background: transparent !important;
-  padding-top: 1rem !important;
-}}
-
-/* ── Expander ── */
-[data-testid="stExpander"] summary {{
-  background-color: {SURFACE} !important;
-  border: 1px solid {BORDER} !important;
-  border-radius: 10px !important;
-  color: {TEXT} !important;
-}}
-[data-testid="stExpander"] > div:last-child {{
-  background-color: {SURFACE} !important;
-  border: 1px solid {BORDER} !important;
-  border-top: none !important;
-  border-radius: 0 0 10px 10px !important;
-}}
-
-/* ── Buttons ── */
-.stButton > button {{
-  background-color: {TEXT} !important;
-  border: none !important;
-  color: #fff !important;
-  font-size: 0.82rem !important;
-  border-radius: 10px !important;
-  padding: 0.45rem 1.2rem !important;
-  transition: background 0.15s !important;
-}}
-.stButton > button:hover {{
-  background-color: {ACCENT} !important;
-}}
-.stButton > button[kind="primary"] {{
-  background-color: {ACCENT} !important;
-}}
-.stDownloadButton > button {{
-  background: transparent !important;
-  border: 1px solid {BORDER} !important;
-  color: {MUTED} !important;
-  font-size: 0.75rem !important;
-  border-radius: 8px !important;
-  box-shadow: none !important;
-}}
-.stDownloadButton > button:hover {{
-  color: {TEXT} !important;
-  background: {LIGHT} !important;
-}}
-
-/* ── Inputs ── */
-.stSelectbox [data-baseweb="select"] > div,
-.stTextInput > div > div > input,
-.stNumberInput > div > div > input,
-textarea {{
-  background-color: {SURFACE} !important;
-  border: 1px solid {BORDER} !important;
-  color: {TEXT} !important;
-  border-radius: 10px !important;
-}}
-div[data-baseweb="option"] {{
-  background-color: {SURFACE} !important;
-  color: {TEXT} !important;
-}}
-div[data-baseweb="option"]:hover {{
-  background-color: {LIGHT} !important;
-}}
-
-/* ── File uploader ── */
-.stFileUploader > div {{
-  background: {SURFACE} !important;
-  border: 2px dashed {BORDER} !important;
-  border-radius: 16px !important;
-}}
-
-/* ── Dataframe / charts ── */
-.stDataFrame {{
-  border: 1px solid {BORDER} !important;
-  border-radius: 12px !important;
-  overflow: hidden !important;
-}}
-.stPlotlyChart {{
-  border: 1px solid {BORDER} !important;
-  border-radius: 16px !important;
-  overflow: hidden !important;
-  background: {SURFACE} !important;
-}}
-
-/* ── Alerts ── */
-div[data-testid="stAlert"] {{
-  border-radius: 12px !important;
-}}
-
-/* ── Progress bar ── */
-.stProgress > div > div > div > div {{
-  background: {ACCENT} !important;
-  border-radius: 4px !important;
-}}
-
-/* ── Tags (multiselect) ── */
-div[data-baseweb="tag"] {{
-  background: rgba(78,205,196,0.12) !important;
-  border-radius: 6px !important;
-}}
-
-/* ── Hide only deploy/footer chrome, leave sidebar toggle alone ── */
-#MainMenu {{ visibility: hidden; }}
-footer {{ visibility: hidden; }}
-.stDeployButton {{ display: none !important; }}
-
-/* ── Custom layout classes ── */
-.bip-header {{
-  display: flex; align-items: center; gap: 14px;
-  padding-bottom: 1.5rem; margin-bottom: 2rem;
-  border-bottom: 1px solid {BORDER};
-}}
-.bip-header h1 {{
-  font-size: 1.55rem !important; font-weight: 700 !important;
-  color: {TEXT} !important; margin: 0 !important;
-}}
-.bip-header .sub {{
-  font-family: 'DM Mono', monospace; font-size: 0.6rem; letter-spacing: 3px;
-  text-transform: uppercase; color: {MUTED};
-  background: {LIGHT}; border: 1px solid {BORDER};
-  padding: 4px 12px; border-radius: 20px;
-}}
-.section-label {{
-  font-family: 'DM Mono', monospace; font-size: 0.57rem; letter-spacing: 3px;
-  text-transform: uppercase; color: {MUTED}; margin: 1.5rem 0 0.75rem;
-}}
-.patient-card {{
-  background: {SURFACE}; border: 1px solid {BORDER};
-  border-radius: 16px; padding: 1.5rem 2rem; margin-bottom: 1.75rem;
-  display: grid; grid-template-columns: repeat(4,1fr); gap: 1.5rem;
-  box-shadow: 0 2px 16px rgba(0,0,0,0.04);
-}}
-.patient-card .field label {{
-  font-family: 'DM Mono', monospace; font-size: 0.55rem; letter-spacing: 2.5px;
-  text-transform: uppercase; color: {MUTED}; display: block; margin-bottom: 6px;
-}}
-.patient-card .field value {{ font-size: 1.05rem; font-weight: 600; color: {TEXT}; }}
-.section-label {{ font-family: 'DM Mono', monospace; font-size: 0.57rem; letter-spacing: 3px;
-  text-transform: uppercase; color: {MUTED}; margin: 1.5rem 0 0.75rem; }}
-.callout {{
-  background: {LIGHT}; border: 1px solid {BORDER};
-  border-left: 3px solid {ACCENT}; border-radius: 0 12px 12px 0;
-  padding: 0.85rem 1.2rem; margin-top: 0.5rem; font-size: 0.82rem; line-height: 1.75; color: {MUTED};
-}}
-.callout b {{ color: {TEXT}; }}
-.callout-title {{
-  font-family: 'DM Mono', monospace; font-size: 0.55rem; letter-spacing: 2px;
-  text-transform: uppercase; color: {ACCENT}; margin-bottom: 5px;
-}}
-.range-legend {{ display: inline-flex; align-items: center; gap: 6px; font-size: 0.7rem; color: {MUTED}; margin-bottom: 0.4rem; }}
-.dot {{ width: 9px; height: 9px; border-radius: 50%; display: inline-block; }}
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def _app_css() -> str:
+    """assets/style.css with its $NAME placeholders filled from the palette above."""
+    css = Template((Path(__file__).parent / "assets" / "style.css").read_text(encoding="utf-8"))
+    css = css.substitute(BG=BG, SURFACE=SURFACE, BORDER=BORDER, ACCENT=ACCENT,
+                         TEXT=TEXT, MUTED=MUTED, LIGHT=LIGHT)
+    return f"\n<style>\n{css}</style>\n"
+
+
+st.markdown(_app_css(), unsafe_allow_html=True)
 
 # JS: Force light color-scheme
 st.markdown("""
@@ -306,27 +109,6 @@ st.markdown("""
 </script>
 """, unsafe_allow_html=True)
 
-def _parse_range(s):
-    """Parse range string to (low, high) floats. Used in render functions."""
-    if s is None or (hasattr(s, '__class__') and s.__class__.__name__ == 'float' and s != s):
-        return None, None
-    s = str(s).strip()
-    if not s or s.lower() in ("nan", "none", ""):
-        return None, None
-    try:
-        if s.startswith("<="):  return None, float(s[2:])
-        if s.startswith("<"):   return None, float(s[1:])
-        if s.startswith(">="):  return float(s[2:]), None
-        if s.startswith(">"):   return float(s[1:]),  None
-        for sep in ["\u2013", "-"]:
-            if sep in s:
-                a, b = s.split(sep, 1)
-                return float(a.strip()), float(b.strip())
-        v = float(s)
-        return v, v
-    except (ValueError, IndexError):
-        return None, None
-
 
 def bm_lookup(test_name: str) -> dict:
     """
@@ -340,6 +122,66 @@ def bm_lookup(test_name: str) -> dict:
     return {}
 
 
+_BM_RANGE_COLS = ["optimal_min", "optimal_max", "normal_min", "normal_max",
+                  "high_risk_min", "high_risk_max", "diseased_min", "diseased_max"]
+
+
+@st.cache_resource
+def _bm_ranges() -> pd.DataFrame:
+    """Dictionary zone bounds as a float frame indexed by canonical name (NaN = open)."""
+    return (pd.DataFrame.from_dict(BIOMARKERS, orient="index")
+              .reindex(columns=_BM_RANGE_COLS)
+              .apply(pd.to_numeric, errors="coerce"))
+
+
+@st.cache_resource
+def _bm_panels() -> dict:
+    """Canonical name -> dictionary category, for names that have a usable one."""
+    return {name: str(bm["category"]) for name, bm in BIOMARKERS.items()
+            if bm.get("category") and str(bm["category"]).lower() not in ("nan", "none", "")}
+
+
+def _tag_status(df: pd.DataFrame, col: str = "status") -> pd.DataFrame:
+    """
+    Add boolean _is_high / _is_low / _is_crit / _abnormal columns from `col`,
+    so renderers slice on precomputed flags instead of re-scanning strings.
+    """
+    s = df[col].astype(str)
+    df["_is_high"]  = s.str.contains("HIGH", regex=False)
+    df["_is_low"]   = s.str.contains("LOW", regex=False)
+    df["_is_crit"]  = s.str.contains("CRITICAL", regex=False)
+    df["_abnormal"] = df["_is_high"] | df["_is_low"]
+    return df
+
+
+def classify_zones(df: pd.DataFrame) -> np.ndarray:
+    """
+    Vectorised zone for every row of a get_snapshot() frame (uses its status flags):
+    'Optimal' | 'Normal' | 'High Risk' | 'Diseased'.
+      CRITICAL status, or HIGH/LOW past the diseased bound → Diseased
+      any other HIGH/LOW                                   → High Risk
+      in-range value inside the optimal sub-range          → Optimal
+    """
+    rng  = _bm_ranges().reindex(df["test_name"].to_numpy())
+    val  = pd.to_numeric(df["value"], errors="coerce").to_numpy(dtype=float)
+    high = df["_is_high"].to_numpy()
+    low  = df["_is_low"].to_numpy()
+    crit = df["_is_crit"].to_numpy()
+
+    o_min, o_max = rng["optimal_min"].to_numpy(), rng["optimal_max"].to_numpy()
+    # NaN bounds compare False, so a missing bound never triggers its branch
+    with np.errstate(invalid="ignore"):
+        diseased = crit | (high & (val >= rng["diseased_min"].to_numpy())) \
+                        | (low  & (val <= rng["diseased_max"].to_numpy()))
+        optimal  = (~np.isnan(o_min) | ~np.isnan(o_max)) & ~(val < o_min) & ~(val > o_max)
+
+    return np.select(
+        [np.isnan(val), diseased, high | low, optimal],
+        ["Normal", "Diseased", "High Risk", "Optimal"],
+        default="Normal",
+    )
+
+
 # ─────────────────────────────────────────────
 # UTILITIES
 # ─────────────────────────────────────────────
@@ -353,24 +195,127 @@ def clean_unit(u) -> str:
              .replace("\ufffd", "µ"))
 
 
-def safe_name(history: pd.DataFrame) -> str:
-    n = history["patient_name"].iloc[0]
+# Download formats: label -> (file extension, MIME type). CSV stays the default
+# for spreadsheet users; the Arrow formats skip float-to-text conversion.
+_EXPORT_FORMATS = {
+    "CSV":     ("csv",     "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Feather": ("feather", "application/vnd.apache.arrow.file"),
+}
+
+
+def _frame_bytes(df: pd.DataFrame, fmt: str = "CSV") -> bytes:
+    """Export payload in `fmt`; helper columns (leading underscore) are left out."""
+    out = df.loc[:, ~df.columns.str.startswith("_")]
+    buf = io.BytesIO()      # encoded straight into bytes — no intermediate str copy
+    if fmt == "Parquet":
+        out.to_parquet(buf, index=False)
+    elif fmt == "Feather":
+        out.reset_index(drop=True).to_feather(buf, compression="lz4")
+    else:
+        out.to_csv(buf, index=False, encoding="utf-8")
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _export_bytes(key: tuple, fmt: str, _df: pd.DataFrame) -> bytes:
+    """_frame_bytes memoised on (patient, view, store version) and format — _df itself is not hashed."""
+    return _frame_bytes(_df, fmt)
+
+
+def export_button(label: str, df: pd.DataFrame, key: tuple, file_stem: str, widget_key: str):
+    """Download button for `df` in the sidebar-selected export format."""
+    fmt       = st.session_state.get("export_fmt", "CSV")
+    ext, mime = _EXPORT_FORMATS[fmt]
+    st.download_button(
+        f"{label} {fmt}",
+        data=_export_bytes(key, fmt, df),
+        file_name=f"{file_stem}.{ext}",
+        mime=mime,
+        key=widget_key,
+    )
+
+
+def _patient_meta(history: pd.DataFrame) -> dict:
+    """Per-patient scalars (name, gender, age) pulled once from a history frame."""
+    age_col = "current_age" if "current_age" in history.columns else "age_at_test"
+    age_val = history[age_col].dropna()
+    return {
+        "name":   history["patient_name"].iat[0],
+        "gender": history["gender"].iat[0],
+        "age":    str(int(age_val.iat[0])) if not age_val.empty else "—",
+    }
+
+
+def safe_name(history: pd.DataFrame, meta: dict = None) -> str:
+    n = (meta or _patient_meta(history))["name"]
     return str(n).replace(" ", "_") if pd.notna(n) else "patient"
 
 
-def _status_sort(s: str) -> int:
-    if "CRITICAL" in str(s): return 0
-    if "HIGH"     in str(s): return 1
-    if "LOW"      in str(s): return 2
-    return 3
+def _point_colors(status: pd.Series) -> np.ndarray:
+    s = status.astype(str)
+    return np.select(
+        [s.str.contains("CRITICAL"), s.str.contains("HIGH"), s.str.contains("LOW")],
+        [CRIT, ORANGE, PURPLE], default=ACCENT,
+    )
 
 
-def _point_color(status: str) -> str:
-    s = str(status)
-    if "CRITICAL" in s: return CRIT
-    if "HIGH"     in s: return ORANGE
-    if "LOW"      in s: return PURPLE
-    return ACCENT
+_HISTORY_PAGE_ROWS = 200     # Full History tab rows per page
+_TREND_MAX_POINTS  = 500
+_TREND_GL_POINTS   = 50      # switch trend charts to WebGL at this many readings
+
+# Static part of the per-chart range legend; only the target-range text varies
+_RANGE_LEGEND_HTML = (
+    '<div class="range-legend" style="margin-top:0.25rem;margin-bottom:0.5rem">'
+    f'<span class="dot" style="background:{ACCENT}"></span>Optimal range'
+    f'<span class="dot" style="background:{ORANGE};margin-left:12px"></span>High'
+    f'<span class="dot" style="background:{PURPLE};margin-left:12px"></span>Low'
+    ' &nbsp;·&nbsp; <span style="font-size:0.68rem">{ann}</span></div>'
+)
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: positions of the n_out points that best
+    preserve the visual shape of (x, y). First and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep  = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (or the final point) is the third vertex
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[hi:nxt_hi].mean(), y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    MinMax preselection: positions of the min and max of ~n_out/2 equal-size
+    buckets, plus both endpoints. Cheap and keeps every local extreme, so it
+    bounds the work LTTB does on very long series without losing spikes.
+    """
+    n = len(y)
+    size    = -(-n // max(1, n_out // 2))           # ceil division
+    buckets = -(-n // size)
+    padded  = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    blocks  = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    keep = np.concatenate([[0, n - 1],
+                           offsets + np.nanargmin(blocks, axis=1),
+                           offsets + np.nanargmax(blocks, axis=1)])
+    return np.unique(keep)
 
 
 def status_pill(status: str) -> str:
@@ -384,53 +329,124 @@ def status_pill(status: str) -> str:
     return f'<span style="background:{ACCENT}22;color:{ACCENT};font-weight:600;padding:2px 8px;border-radius:20px;font-size:0.78rem">{s or "Normal"}</span>'
 
 
-_tmp_files: list[str] = []
+_UPLOAD_WORKERS = 4      # concurrent extractions per batch (bounded by API rate limits)
+
+def _make_tmp(src, batch_dir: str, suffix: str = ".pdf") -> Path:
+    """
+    Spill an uploaded file into the batch's temp directory without
+    materialising another bytes copy. The directory (and every file in it)
+    is removed as a unit when the batch finishes.
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=batch_dir) as f:
+        if hasattr(src, "getbuffer"):      # UploadedFile is a BytesIO — write its buffer directly
+            f.write(src.getbuffer())
+        else:
+            shutil.copyfileobj(src, f, length=1 << 20)
+        return Path(f.name)
+
+
+# ─────────────────────────────────────────────
+# CACHED DATA ACCESS
+# Keyed on store_version() (or pending_version() for the review file), so any
+# write to the store (from this session or another) produces a new key and the
+# next rerun reloads; plain widget interactions reuse the cached frames.
+# ─────────────────────────────────────────────
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_history(pid: str, version: tuple) -> pd.DataFrame:
+    """load_history with units normalised once here rather than in every renderer."""
+    df = load_history(pid)
+    if not df.empty:
+        df["unit"] = df["unit"].map(clean_unit)
+    return df
+
 
-def _make_tmp(data: bytes, suffix: str = ".pdf") -> Path:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
-        f.write(data)
-        path = f.name
-    _tmp_files.append(path)
-    return Path(path)
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_trends(pid: str, version: tuple) -> pd.DataFrame:
+    return _tag_status(generate_trends(_cached_history(pid, version)), "latest_status")
 
-def _cleanup_tmp():
-    for p in _tmp_files:
-        try:
-            os.unlink(p)
-        except OSError:
-            pass
 
-atexit.register(_cleanup_tmp)
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_snapshot(pid: str, version: tuple) -> pd.DataFrame:
+    return get_snapshot(_cached_history(pid, version))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_history_view(pid: str, version: tuple) -> pd.DataFrame:
+    """Full History tab frame: display columns, newest report first — sorted once per version."""
+    history = _cached_history(pid, version)
+    cols = [c for c in ("report_date", "test_name", "value", "unit", "status", "source_file")
+            if c in history.columns]
+    return (history[cols]
+            .sort_values(["report_date", "test_name"], ascending=[False, True])
+            .reset_index(drop=True))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_date_tests(pid: str, version: tuple) -> dict:
+    """{'YYYY-MM-DD': sorted test names} for the manual-edit selectors."""
+    history = _cached_history(pid, version)
+    return {d: sorted(g.unique().tolist())
+            for d, g in history.groupby("_date_str", observed=True)["test_name"]}
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_edit_records(pid: str, version: tuple) -> dict:
+    """{(day, test_name): {'value', 'unit'}} — O(1) current-value lookups for the edit form."""
+    history = _cached_history(pid, version)
+    return {(d, t): {"value": v, "unit": u}
+            for d, t, v, u in history[["_date_str", "test_name", "value", "unit"]]
+                                     .itertuples(index=False, name=None)}
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_patients(version: tuple) -> list:
+    return list_patients()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_pending(version: tuple | None) -> list:
+    return load_pending_reviews()
 
 
 def get_snapshot(history: pd.DataFrame) -> pd.DataFrame:
-    return (history.sort_values("report_date")
-                   .groupby("test_name").last()
-                   .reset_index())
+    """
+    Latest reading per test (whole row) with _tag_status flags, ordered by
+    test name. Relies on load_history's ORDER BY report_date — no re-sort of the history.
+    test_name leads the columns, as groupby("test_name").last().reset_index()
+    used to lay them out, so the Latest CSV export keeps its header.
+    """
+    cols = ["test_name", *history.columns.drop("test_name")]
+    return _tag_status(history.drop_duplicates("test_name", keep="last")
+                              .sort_values("test_name", kind="stable")
+                              .reset_index(drop=True)[cols])
 
 
 # ─────────────────────────────────────────────
 # RENDER: PATIENT CARD
 # ─────────────────────────────────────────────
 
-def render_patient_card(history: pd.DataFrame):
-    name    = history["patient_name"].iloc[0]
-    gender  = history["gender"].iloc[0]
-    age_col = "current_age" if "current_age" in history.columns else "age_at_test"
-    age_val = history[age_col].dropna()
-    age_str = str(int(age_val.iloc[0])) if not age_val.empty else "—"
+@st.cache_data(show_spinner=False, max_entries=64)
+def _patient_card_html(pid: str, version: tuple) -> str:
+    """Patient card markup, built once per patient and store version."""
+    history = _cached_history(pid, version)
+    meta    = _patient_meta(history)
     dates   = history["report_date"].dropna()
-    n       = len(dates.dt.strftime("%Y-%m-%d").unique()) if not dates.empty else 0
+    n       = dates.dt.normalize().nunique()
     last_dt = dates.max().strftime("%d %b %Y") if not dates.empty else "—"
-    g_str   = "Male" if str(gender).upper() == "M" else "Female"
+    g_str   = "Male" if str(meta["gender"]).upper() == "M" else "Female"
 
-    st.markdown(f"""
+    return f"""
     <div class="patient-card">
-      <div class="field"><label>Patient</label><value>{name}</value></div>
+      <div class="field"><label>Patient</label><value>{meta["name"]}</value></div>
       <div class="field"><label>Gender</label><value>{g_str}</value></div>
-      <div class="field"><label>Age</label><value>{age_str}</value></div>
+      <div class="field"><label>Age</label><value>{meta["age"]}</value></div>
       <div class="field"><label>Reports</label><value>{n}  <span style="font-size:0.75rem;color:{MUTED};font-weight:400">· last {last_dt}</span></value></div>
-    </div>""", unsafe_allow_html=True)
+    </div>"""
+
+
+def render_patient_card(pid: str, version: tuple):
+    st.markdown(_patient_card_html(pid, version), unsafe_allow_html=True)
 
 
 # ─────────────────────────────────────────────
@@ -460,62 +476,22 @@ def render_radial_overview(snapshot: pd.DataFrame, filter_status: str = "all"):
     import math
 
     df = snapshot.copy()
-    df["unit"] = df["unit"].apply(clean_unit)
 
     if filter_status == "critical":
-        df = df[df["status"].str.contains("CRITICAL", na=False)]
+        df = df[df["_is_crit"]]
     elif filter_status == "oor":
-        df = df[df["status"].str.contains("HIGH|LOW", na=False)]
+        df = df[df["_abnormal"]]
     elif filter_status == "normal":
-        df = df[~df["status"].str.contains("HIGH|LOW|CRITICAL", na=False)]
+        df = df[~(df["_abnormal"] | df["_is_crit"])]
 
     if len(df) == 0:
         st.info("No biomarkers match this filter.")
         return
 
-    # ── helpers ────────────────────────────────────────────────────────────
-    def _safe_float(v):
-        """Convert to float, return None if not possible or NaN."""
-        try:
-            f = float(v)
-            return None if math.isnan(f) else f
-        except (TypeError, ValueError):
-            return None
-
     # ── Classify each biomarker into a zone using real patient values ──────
-    def classify(row):
-        bm  = bm_lookup(row["test_name"])
-        s   = str(row.get("status", ""))
-        val = _safe_float(row["value"])
-        if val is None:
-            return "normal"
-
-        # CRITICAL flag → always Diseased
-        if "CRITICAL" in s:
-            return "disease"
-
-        if "HIGH" in s or "LOW" in s:
-            # Check if value crosses into diseased threshold
-            d_min = _safe_float(bm.get("diseased_min"))
-            d_max = _safe_float(bm.get("diseased_max"))
-            if "HIGH" in s and d_min is not None and val >= d_min:
-                return "disease"
-            if "LOW"  in s and d_max is not None and val <= d_max:
-                return "disease"
-            return "highrisk"
-
-        # Normal status — check whether inside optimal range
-        o_min = _safe_float(bm.get("optimal_min"))
-        o_max = _safe_float(bm.get("optimal_max"))
-        has_optimal = (o_min is not None or o_max is not None)
-        if has_optimal:
-            below = (o_min is not None and val < o_min)
-            above = (o_max is not None and val > o_max)
-            if not below and not above:
-                return "optimal"
-        return "normal"
-
-    df["_zone"] = df.apply(classify, axis=1)
+    _radial_key = {"Optimal": "optimal", "Normal": "normal",
+                   "High Risk": "highrisk", "Diseased": "disease"}
+    df["_zone"] = pd.Series(classify_zones(df), index=df.index).map(_radial_key)
 
     groups = {z: df[df["_zone"] == z].reset_index(drop=True)
               for z in ("optimal", "normal", "highrisk", "disease")}
@@ -765,8 +741,8 @@ def render_radial_overview(snapshot: pd.DataFrame, filter_status: str = "all"):
 
 def render_summary_cards(snapshot: pd.DataFrame):
     total    = len(snapshot)
-    critical = snapshot["status"].str.contains("CRITICAL", na=False).sum()
-    abnormal = snapshot["status"].str.contains("HIGH|LOW", na=False).sum()
+    critical = snapshot["_is_crit"].sum()
+    abnormal = snapshot["_abnormal"].sum()
     normal   = total - abnormal
     oor      = abnormal - critical
     pct_ok   = int(normal / total * 100) if total else 0
@@ -821,10 +797,9 @@ def render_results_table(snapshot: pd.DataFrame, table_key: str = "focus_table",
       • The active filter value is read from st.session_state BEFORE the HTML
         is built, so the "Your essential insights: <Zone>" header always matches.
     """
-    import math, html as _html_mod
+    import html as _html_mod
 
     df = snapshot.copy()
-    df["unit"] = df["unit"].apply(clean_unit)
 
     # ── Design tokens ────────────────────────────────────────────────────────
     ZONE_C = {
@@ -846,68 +821,27 @@ def render_results_table(snapshot: pd.DataFrame, table_key: str = "focus_table",
         "Diseased":  "rgba(239,107,107,0.45)",
     }
 
-    # ── Helper: safe float ───────────────────────────────────────────────────
-    def _sf(v):
-        try:
-            f = float(v)
-            return None if math.isnan(f) else f
-        except (TypeError, ValueError):
-            return None
-
-    # ── Classify every biomarker into one of the four zones ─────────────────
-    def classify_zone(row):
-        bm  = bm_lookup(row["test_name"])
-        s   = str(row.get("status", ""))
-        val = _sf(row["value"])
-        if val is None:
-            return "Normal"
-        if "CRITICAL" in s:
-            return "Diseased"
-        if "HIGH" in s or "LOW" in s:
-            if "HIGH" in s:
-                d_min = _sf(bm.get("diseased_min"))
-                if d_min is not None and val >= d_min:
-                    return "Diseased"
-            if "LOW" in s:
-                d_max = _sf(bm.get("diseased_max"))
-                if d_max is not None and val <= d_max:
-                    return "Diseased"
-            return "High Risk"
-        # Normal status — check optimal sub-range
-        o_min = _sf(bm.get("optimal_min"))
-        o_max = _sf(bm.get("optimal_max"))
-        if o_min is not None or o_max is not None:
-            if not (o_min is not None and val < o_min) and \
-               not (o_max is not None and val > o_max):
-                return "Optimal"
-        return "Normal"
-
-    # ── Build reference range string shown in the Range column ──────────────
-    def fmt_range(row):
-        bm   = bm_lookup(row["test_name"])
-        zone = row["_zone"]
-        # Pick the most relevant range for the zone
-        if zone == "Optimal":
-            lo, hi = _sf(bm.get("optimal_min")), _sf(bm.get("optimal_max"))
-        elif zone in ("High Risk", "Diseased"):
-            lo, hi = _sf(bm.get("high_risk_min")), _sf(bm.get("high_risk_max"))
-        else:
-            lo, hi = _sf(bm.get("normal_min")), _sf(bm.get("normal_max"))
-        # Fall back to normal range if zone-specific is missing
-        if lo is None and hi is None:
-            lo, hi = _sf(bm.get("normal_min")), _sf(bm.get("normal_max"))
-        if lo is not None and hi is not None:
-            return f"({lo:.4g} – {hi:.4g})"
-        if hi is not None:
-            return f"(< {hi:.4g})"
-        if lo is not None:
-            return f"(≥ {lo:.4g})"
-        return "—"
-
-    # ── Category / panel name ────────────────────────────────────────────────
-    def get_panel(row):
-        cat = bm_lookup(row["test_name"]).get("category", "")
-        return str(cat) if cat and str(cat).lower() not in ("nan", "none", "") else "—"
+    # ── Reference range shown in the Range column ───────────────────────────
+    # Most relevant bounds for the zone, falling back to the normal range when
+    # the zone-specific pair is missing — computed for all rows at once.
+    def fmt_ranges(names: pd.Series, zones: np.ndarray) -> np.ndarray:
+        rng  = _bm_ranges().reindex(names.astype(str))
+        opt  = zones == "Optimal"
+        risk = (zones == "High Risk") | (zones == "Diseased")
+        lo = np.where(opt, rng["optimal_min"], np.where(risk, rng["high_risk_min"], rng["normal_min"]))
+        hi = np.where(opt, rng["optimal_max"], np.where(risk, rng["high_risk_max"], rng["normal_max"]))
+        none = np.isnan(lo) & np.isnan(hi)
+        lo = np.where(none, rng["normal_min"], lo)
+        hi = np.where(none, rng["normal_max"], hi)
+        has_lo, has_hi = ~np.isnan(lo), ~np.isnan(hi)
+        lo_s, hi_s = np.char.mod("%.4g", lo), np.char.mod("%.4g", hi)
+        return np.select(
+            [has_lo & has_hi, has_hi, has_lo],
+            [np.char.add(np.char.add("(", lo_s), np.char.add(np.char.add(" – ", hi_s), ")")),
+             np.char.add("(< ", np.char.add(hi_s, ")")),
+             np.char.add("(≥ ", np.char.add(lo_s, ")"))],
+            "—",
+        )
 
     # ── Format value for display ─────────────────────────────────────────────
     def fmt_val(v):
@@ -915,9 +849,9 @@ def render_results_table(snapshot: pd.DataFrame, table_key: str = "focus_table",
         except: return str(v)
 
     # Enrich dataframe
-    df["_zone"]    = df.apply(classify_zone, axis=1)
-    df["_range"]   = df.apply(fmt_range, axis=1)
-    df["_panel"]   = df.apply(get_panel, axis=1)
+    df["_zone"]    = classify_zones(df)
+    df["_range"]   = fmt_ranges(df["test_name"], df["_zone"])
+    df["_panel"]   = df["test_name"].astype(str).map(_bm_panels()).fillna("—")
     df["_val_str"] = df["value"].apply(fmt_val)
 
     # ── Session-state key — unique per table_key so two tables can coexist ───
@@ -1003,16 +937,17 @@ def render_results_table(snapshot: pd.DataFrame, table_key: str = "focus_table",
 
 
     # ── Table rows ────────────────────────────────────────────────────────────
-    rows_html = ""
-    for _, row in view_df.iterrows():
-        z    = row["_zone"]
-        name = _html_mod.escape(str(row["test_name"]))
-        unit = _html_mod.escape(str(row["unit"]))
-        rng  = _html_mod.escape(str(row["_range"]))
-        pan  = _html_mod.escape(str(row["_panel"]))
+    row_parts = []
+    for z, name, unit, rng, pan, val_str in view_df[
+        ["_zone", "test_name", "unit", "_range", "_panel", "_val_str"]
+    ].itertuples(index=False, name=None):
+        name = _html_mod.escape(str(name))
+        unit = _html_mod.escape(str(unit))
+        rng  = _html_mod.escape(str(rng))
+        pan  = _html_mod.escape(str(pan))
         zc   = ZONE_C.get(z, "#52c49a")
-        v_pill = pill(row['_val_str'], z)
-        rows_html += (
+        v_pill = pill(val_str, z)
+        row_parts.append(
             '<tr style="border-bottom:1px solid #f3f4f6;"'
             ' onmouseover="this.style.background=\'#fafafa\'"'
             ' onmouseout="this.style.background=\'transparent\'">'
@@ -1030,6 +965,7 @@ def render_results_table(snapshot: pd.DataFrame, table_key: str = "focus_table",
             f'<td style="padding:13px 0 13px 12px;font-size:13px;color:#6b7280;vertical-align:middle;">{pan}</td>'
             '</tr>'
         )
+    rows_html = "".join(row_parts)
 
     empty_row = (
         '<tr><td colspan="4" style="padding:40px;text-align:center;'
@@ -1113,7 +1049,6 @@ def render_results_table(snapshot: pd.DataFrame, table_key: str = "focus_table",
 
 def render_trends_table(trends: pd.DataFrame):
     df = trends.copy()
-    df["unit"] = df["unit"].apply(clean_unit)
 
     def fmt(v):
         try: return f"{float(v):.4g}"
@@ -1165,242 +1100,145 @@ def render_trends_table(trends: pd.DataFrame):
 
 
 # ─────────────────────────────────────────────
-# RENDER: PILL SLIDER
+# RENDER: TREND CHARTS
 # ─────────────────────────────────────────────
 
-def render_pill_slider(value: float, n_min, o_min, n_max, o_max, unit: str, status: str) -> str:
-    ref_lo = o_min if o_min is not None else n_min
-    ref_hi = o_max if o_max is not None else n_max
-    if o_min is not None and o_max is not None:
-        optimal = (o_min + o_max) / 2
-    elif o_max is not None:
-        optimal = o_max
-    elif o_min is not None:
-        optimal = o_min
-    else:
-        optimal = None
-
-    if ref_lo is None and ref_hi is None:
-        return ""
-
-    all_vals = [v for v in [value, ref_lo, ref_hi, n_min, n_max] if v is not None]
-    if not all_vals:
-        return ""
-
-    span_lo = min(all_vals) * 0.7
-    span_hi = max(all_vals) * 1.35
-    span_lo = min(span_lo, value * 0.7) if value > 0 else span_lo - abs(value) * 0.3
-    span_hi = max(span_hi, value * 1.35) if value > 0 else span_hi + abs(value) * 0.3
-    if span_lo == span_hi:
-        span_lo -= 1; span_hi += 1
-    span = span_hi - span_lo
-
-    def pct(v):
-        return max(3, min(95, (v - span_lo) / span * 100))
-
-    s = str(status)
-    if   "CRITICAL" in s: dot_color = CRIT
-    elif "HIGH"     in s: dot_color = ORANGE
-    elif "LOW"      in s: dot_color = PURPLE
-    else:                  dot_color = BLUE
-
-    val_pct = pct(value)
-
-    opt_html = ""
-    if ref_lo is not None and ref_hi is not None:
-        opt_l = pct(ref_lo); opt_r = pct(ref_hi)
-        opt_html = (
-            f'<div style="position:absolute;left:{opt_l}%;width:{opt_r-opt_l}%;'
-            f'height:100%;background:rgba(78,205,196,0.15);'
-            f'border:1.5px dashed {ACCENT};border-radius:20px;box-sizing:border-box"></div>'
-        )
-    elif ref_hi is not None:
-        opt_r = pct(ref_hi)
-        opt_html = (
-            f'<div style="position:absolute;left:3%;width:{opt_r-3}%;'
-            f'height:100%;background:rgba(78,205,196,0.12);'
-            f'border:1.5px dashed {ACCENT};border-right:none;border-radius:20px 0 0 20px;box-sizing:border-box"></div>'
-        )
-    elif ref_lo is not None:
-        opt_l = pct(ref_lo)
-        opt_html = (
-            f'<div style="position:absolute;left:{opt_l}%;width:{95-opt_l}%;'
-            f'height:100%;background:rgba(78,205,196,0.12);'
-            f'border:1.5px dashed {ACCENT};border-left:none;border-radius:0 20px 20px 0;box-sizing:border-box"></div>'
-        )
-
-    opt_label_html = ""
-    if optimal is not None:
-        opt_pct = pct(optimal)
-        opt_str = f"< {optimal:.4g}" if (o_min is None and o_max is not None) else \
-                  f"> {optimal:.4g}" if (o_min is not None and o_max is None) else \
-                  f"{optimal:.4g}"
-        opt_label_html = (
-            f'<div style="position:absolute;bottom:-17px;left:{opt_pct}%;'
-            f'transform:translateX(-50%);font-size:0.6rem;color:{ACCENT};'
-            f'white-space:nowrap;font-weight:500">{opt_str}</div>'
-        )
-
-    val_str = f"{value:.4g}"
-
-    html = f"""
-    <div style="position:relative;margin-top:22px;margin-bottom:22px;padding:0 8px">
-      <div style="position:relative;height:26px;background:{LIGHT};
-                  border:1.5px dashed {BORDER};border-radius:20px;overflow:visible;
-                  box-sizing:border-box">
-        {opt_html}
-        <div style="position:absolute;top:-18px;left:{val_pct}%;
-                    transform:translateX(-50%);font-size:0.68rem;
-                    font-weight:700;color:{dot_color};white-space:nowrap">{val_str}</div>
-        <div style="position:absolute;top:50%;left:{val_pct}%;
-                    transform:translate(-50%,-50%);
-                    width:20px;height:20px;border-radius:50%;
-                    background:{dot_color};border:3px solid {SURFACE};
-                    box-shadow:0 2px 6px rgba(0,0,0,0.18);z-index:3"></div>
-        {opt_label_html}
-      </div>
-    </div>"""
-    return html
-
-
-# ─────────────────────────────────────────────
-# RENDER: BIOMARKER DETAIL CARDS
-# ─────────────────────────────────────────────
+@st.cache_resource(show_spinner=False, max_entries=128,
+                   hash_funcs={pd.DataFrame: lambda d: int(pd.util.hash_pandas_object(d, index=False).sum())})
+def _trend_fig(test: str, ts: pd.DataFrame, unit: str,
+               lo, hi, n_min, n_max):
+    """
+    Plotly figure for one biomarker trend — rebuilt only when its series changes.
+    cache_resource hands back the shared figure (cache_data would unpickle a
+    copy on every hit, which costs as much as building it); st.plotly_chart
+    only serialises the figure, so sharing it is safe.
+    """
+    import plotly.graph_objects as go
+
+    y_vals = ts["value"].dropna()
+    if len(ts) > _TREND_MAX_POINTS:
+        ts   = ts.dropna(subset=["value"])
+        x    = ts["report_date"].to_numpy("int64").astype(float)
+        y    = ts["value"].to_numpy(float)
+        keep = np.arange(len(ts))
+        if len(ts) > 4 * _TREND_MAX_POINTS:
+            keep = _minmax_indices(y, 4 * _TREND_MAX_POINTS)
+        ts = ts.iloc[keep[_lttb_indices(x[keep], y[keep], _TREND_MAX_POINTS)]]
+    candidates = list(y_vals) + [v for v in [lo, hi, n_min, n_max] if v is not None]
+    axis_lo = min(candidates) * 0.82
+    axis_hi = max(candidates) * 1.22
+
+    point_colors = _point_colors(ts["status"])
+    unit_label   = f" {unit}" if unit else ""
 
-def render_biomarker_cards(snapshot: pd.DataFrame, history: pd.DataFrame = None):
-    df = snapshot.copy()
-    df["_ord"] = df["status"].apply(_status_sort)
-    df = df.sort_values(["_ord", "test_name"]).drop(columns=["_ord"])
-    df["unit"] = df["unit"].apply(clean_unit)
-
-    prev_values = {}
-    if history is not None and not history.empty:
-        sorted_hist = history.sort_values("report_date")
-        dates = sorted_hist["report_date"].dt.strftime("%Y-%m-%d").unique()
-        if len(dates) >= 2:
-            prev_date = dates[-2]
-            prev_df = sorted_hist[sorted_hist["report_date"].dt.strftime("%Y-%m-%d") == prev_date]
-            for _, r in prev_df.iterrows():
-                prev_values[r["test_name"]] = r["value"]
+    fig = go.Figure()
 
-    def fmt(v):
-        try: return f"{float(v):.4g}"
-        except: return str(v)
+    if lo is not None and hi is not None:
+        fig.add_hrect(y0=lo, y1=hi,
+                      fillcolor="rgba(78,205,196,0.06)",
+                      line=dict(color=ACCENT, width=1, dash="dot"),
+                      layer="below")
+        fig.add_hrect(y0=hi, y1=axis_hi,
+                      fillcolor="rgba(249,123,90,0.05)",
+                      line_width=0, layer="below")
+        fig.add_hrect(y0=axis_lo, y1=lo,
+                      fillcolor="rgba(192,132,252,0.05)",
+                      line_width=0, layer="below")
+    elif hi is not None:
+        fig.add_hrect(y0=hi, y1=axis_hi, fillcolor="rgba(249,123,90,0.05)", line_width=0, layer="below")
+        fig.add_hrect(y0=axis_lo, y1=hi, fillcolor="rgba(78,205,196,0.06)", line_width=0, layer="below")
+        fig.add_hline(y=hi, line=dict(color=ACCENT, width=1, dash="dot"), layer="below")
+    elif lo is not None:
+        fig.add_hrect(y0=axis_lo, y1=lo, fillcolor="rgba(192,132,252,0.05)", line_width=0, layer="below")
+        fig.add_hrect(y0=lo, y1=axis_hi, fillcolor="rgba(78,205,196,0.06)", line_width=0, layer="below")
+        fig.add_hline(y=lo, line=dict(color=ACCENT, width=1, dash="dot"), layer="below")
+
+    if len(ts) >= _TREND_GL_POINTS:
+        # Dense series: one WebGL trace; per-segment splines and value
+        # labels are SVG-only and would cost a DOM node per point
+        fig.add_trace(go.Scattergl(
+            x=ts["report_date"],
+            y=ts["value"],
+            mode="lines+markers",
+            line=dict(color=ACCENT, width=2),
+            marker=dict(color=point_colors, size=8, line=dict(color=SURFACE, width=1)),
+            hovertemplate=f"%{{x|%b %Y}}<br><b>%{{y:.4g}}</b>{unit_label}<extra></extra>",
+            name=test,
+        ))
+    else:
+        for i in range(len(ts) - 1):
+            seg_color = point_colors[i]
+            fig.add_trace(go.Scatter(
+                x=[ts["report_date"].iloc[i], ts["report_date"].iloc[i+1]],
+                y=[ts["value"].iloc[i], ts["value"].iloc[i+1]],
+                mode="lines",
+                line=dict(color=seg_color, width=2.5, shape="spline"),
+                showlegend=False,
+                hoverinfo="skip",
+            ))
 
-    def _fmt_range(lo, hi) -> str:
-        if lo is not None and hi is not None:
-            return f"{lo:.4g} – {hi:.4g}"
-        elif hi is not None:
-            return f"< {hi:.4g}"
-        elif lo is not None:
-            return f"> {lo:.4g}"
-        return "—"
-
-    def _opt_target(o_min, o_max, n_min, n_max):
-        if o_min is not None and o_max is not None:
-            return (o_min + o_max) / 2
-        elif o_max is not None:
-            return o_max
-        elif o_min is not None:
-            return o_min
-        elif n_min is not None and n_max is not None:
-            return (n_min + n_max) / 2
-        elif n_max is not None:
-            return n_max
-        elif n_min is not None:
-            return n_min
-        return None
-
-    for _, row in df.iterrows():
-        test   = row["test_name"]
-        val    = row["value"]
-        unit   = row["unit"]
-        status = str(row.get("status", ""))
-        bm     = bm_lookup(test)
-
-        n_min = bm.get("normal_min")
-        n_max = bm.get("normal_max")
-        o_min = bm.get("optimal_min")
-        o_max = bm.get("optimal_max")
-        hr_min = bm.get("high_risk_min")
-        hr_max = bm.get("high_risk_max")
-
-        s = status
-        if   "CRITICAL" in s: val_color, bg_accent = CRIT,   "rgba(229,62,62,0.05)"
-        elif "HIGH"     in s: val_color, bg_accent = ORANGE, "rgba(249,123,90,0.05)"
-        elif "LOW"      in s: val_color, bg_accent = PURPLE, "rgba(192,132,252,0.05)"
-        else:                  val_color, bg_accent = BLUE,   "rgba(116,185,232,0.04)"
-
-        try:
-            fval = float(val)
-            pill_html = render_pill_slider(fval, n_min, o_min, n_max, o_max, unit, status)
-        except (ValueError, TypeError):
-            pill_html = ""
-
-        norm_str = _fmt_range(n_min, n_max)
-        opt_target = _opt_target(o_min, o_max, n_min, n_max)
-
-        if opt_target is not None:
-            try:
-                fval2 = float(val)
-                diff = fval2 - opt_target
-                to_opt = f"{'+' if diff > 0 else ''}{diff:.3g}"
-                opt_label = f"Optimal: {opt_target:.4g}"
-            except: to_opt = "—"; opt_label = ""
-        else:
-            to_opt = "—"; opt_label = ""
+        fig.add_trace(go.Scatter(
+            x=ts["report_date"],
+            y=ts["value"],
+            mode="markers+text",
+            marker=dict(
+                color=point_colors,
+                size=14,
+                line=dict(color=SURFACE, width=3),
+                symbol="circle",
+            ),
+            text=np.char.mod("%.4g", ts["value"].to_numpy(float)),
+            textposition="top center",
+            textfont=dict(color=TEXT, size=11, family="DM Sans"),
+            hovertemplate=f"%{{x|%b %Y}}<br><b>%{{y:.4g}}</b>{unit_label}<extra></extra>",
+            name=test,
+        ))
 
-        hr_str = _fmt_range(hr_min, hr_max) if (hr_min is not None or hr_max is not None) else "—"
+    annotations = []
+    if hi is not None:
+        annotations.append(dict(
+            xref="paper", yref="y", x=1.01, y=hi,
+            text="Optimal", showarrow=False,
+            font=dict(color=ACCENT, size=10, family="DM Sans"),
+            xanchor="left",
+        ))
 
-        prev = prev_values.get(test)
-        prev_str = fmt(prev) if prev is not None else "—"
+    title_text = f"<b>{test}</b>"
+    if unit:
+        title_text += f"  <span style='font-size:11px;color:{MUTED}'>({unit})</span>"
 
-        st.markdown(f"""
-        <div style="background:{SURFACE};border:1px solid {BORDER};border-left:4px solid {val_color};
-             border-radius:14px;padding:1.2rem 1.5rem 0.75rem;margin-bottom:0.75rem;
-             background:linear-gradient(135deg,{bg_accent} 0%,{SURFACE} 50%);
-             overflow:hidden;">
-          <div style="display:flex;gap:1.5rem;align-items:flex-start;flex-wrap:nowrap">
-            <div style="min-width:140px;max-width:160px;flex-shrink:0">
-              <div style="font-size:0.92rem;font-weight:700;color:{TEXT};line-height:1.3">⊕ {test}</div>
-              <div style="font-size:0.72rem;color:{MUTED};margin-top:3px">{unit if unit else "—"}</div>
-            </div>
-            <div style="flex:1;display:grid;grid-template-columns:repeat(4,1fr);gap:1rem;min-width:0">
-              <div>
-                <div style="font-size:0.62rem;color:{MUTED};letter-spacing:1px;text-transform:uppercase;margin-bottom:4px">Current</div>
-                <div style="font-size:1.4rem;font-weight:700;color:{val_color};line-height:1">{fmt(val)}</div>
-                <div style="height:1px;background:{BORDER};margin-top:6px"></div>
-              </div>
-              <div>
-                <div style="font-size:0.62rem;color:{MUTED};letter-spacing:1px;text-transform:uppercase;margin-bottom:4px">Normal Range</div>
-                <div style="font-size:0.88rem;font-weight:500;color:{TEXT};line-height:1.4">{norm_str}</div>
-                <div style="height:1px;background:{BORDER};margin-top:6px"></div>
-              </div>
-              <div>
-                <div style="font-size:0.62rem;color:{MUTED};letter-spacing:1px;text-transform:uppercase;margin-bottom:4px">To Optimal</div>
-                <div style="font-size:0.88rem;font-weight:600;color:{TEXT};line-height:1.3">{to_opt}</div>
-                <div style="font-size:0.68rem;color:{MUTED}">{opt_label}</div>
-                <div style="height:1px;background:{BORDER};margin-top:6px"></div>
-              </div>
-              <div>
-                <div style="font-size:0.62rem;color:{MUTED};letter-spacing:1px;text-transform:uppercase;margin-bottom:4px">Previous</div>
-                <div style="font-size:0.88rem;color:{MUTED};line-height:1">{prev_str}</div>
-                <div style="height:1px;background:{BORDER};margin-top:6px"></div>
-              </div>
-            </div>
-          </div>
-          <div style="margin-top:0.5rem;overflow:hidden">
-            {pill_html}
-          </div>
-        </div>""", unsafe_allow_html=True)
+    fig.update_layout(
+        title=dict(text=title_text, font=dict(color=TEXT, size=15, family="DM Sans"), x=0),
+        paper_bgcolor=SURFACE,
+        plot_bgcolor=SURFACE,
+        font=dict(color=MUTED, family="DM Sans"),
+        xaxis=dict(
+            showgrid=True, gridcolor=BORDER, gridwidth=1,
+            tickformat="%b %Y",
+            tickfont=dict(color=MUTED, size=11, family="DM Sans"),
+            zeroline=False, showline=False,
+        ),
+        yaxis=dict(
+            showgrid=True, gridcolor=BORDER, gridwidth=1,
+            tickfont=dict(color=MUTED, size=11, family="DM Sans"),
+            zeroline=False, showline=False,
+            title=dict(text=unit, font=dict(color=MUTED, size=11)),
+            range=[axis_lo, axis_hi],
+        ),
+        margin=dict(l=50, r=80, t=55, b=50),
+        height=320, showlegend=False, hovermode="x unified",
+        hoverlabel=dict(bgcolor=SURFACE, bordercolor=BORDER,
+                        font=dict(color=TEXT, family="DM Sans")),
+        annotations=annotations,
+    )
 
+    return fig
 
-# ─────────────────────────────────────────────
-# RENDER: TREND CHARTS
-# ─────────────────────────────────────────────
 
 def render_trend_charts(history: pd.DataFrame, trends: pd.DataFrame, key_prefix: str = ""):
-    test_names = sorted(trends["test_name"].tolist())
+    # trends already knows how many dated readings each test has — only offer
+    # tests that can actually be drawn as a line
+    test_names = sorted(trends.loc[trends["n_reports"] >= 2, "test_name"].tolist())
     if not test_names:
         return
 
@@ -1417,10 +1255,8 @@ def render_trend_charts(history: pd.DataFrame, trends: pd.DataFrame, key_prefix:
 
     for test in selected:
         ts = get_test_timeseries(history, test)
-        if ts.empty or len(ts) < 2:
-            continue
 
-        unit = clean_unit(ts["unit"].iloc[-1] if "unit" in ts.columns else "")
+        unit = ts["unit"].iloc[-1] if "unit" in ts.columns else ""
         bm   = bm_lookup(test)
 
         n_min  = bm.get("normal_min")
@@ -1433,132 +1269,34 @@ def render_trend_charts(history: pd.DataFrame, trends: pd.DataFrame, key_prefix:
         lo = o_min if o_min is not None else n_min
         hi = o_max if o_max is not None else n_max
 
-        y_vals = ts["value"].dropna()
-        if y_vals.empty:
+        if ts["value"].dropna().empty:
             continue
-        candidates = list(y_vals) + [v for v in [lo, hi, n_min, n_max] if v is not None]
-        axis_lo = min(candidates) * 0.82
-        axis_hi = max(candidates) * 1.22
-
-        point_colors = [_point_color(s) for s in ts["status"]]
-        unit_label   = f" {unit}" if unit else ""
-
-        fig = go.Figure()
-
-        if lo is not None and hi is not None:
-            fig.add_hrect(y0=lo, y1=hi,
-                          fillcolor="rgba(78,205,196,0.06)",
-                          line=dict(color=ACCENT, width=1, dash="dot"),
-                          layer="below")
-            fig.add_hrect(y0=hi, y1=axis_hi,
-                          fillcolor="rgba(249,123,90,0.05)",
-                          line_width=0, layer="below")
-            fig.add_hrect(y0=axis_lo, y1=lo,
-                          fillcolor="rgba(192,132,252,0.05)",
-                          line_width=0, layer="below")
-        elif hi is not None:
-            fig.add_hrect(y0=hi, y1=axis_hi, fillcolor="rgba(249,123,90,0.05)", line_width=0, layer="below")
-            fig.add_hrect(y0=axis_lo, y1=hi, fillcolor="rgba(78,205,196,0.06)", line_width=0, layer="below")
-            fig.add_hline(y=hi, line=dict(color=ACCENT, width=1, dash="dot"), layer="below")
-        elif lo is not None:
-            fig.add_hrect(y0=axis_lo, y1=lo, fillcolor="rgba(192,132,252,0.05)", line_width=0, layer="below")
-            fig.add_hrect(y0=lo, y1=axis_hi, fillcolor="rgba(78,205,196,0.06)", line_width=0, layer="below")
-            fig.add_hline(y=lo, line=dict(color=ACCENT, width=1, dash="dot"), layer="below")
-
-        for i in range(len(ts) - 1):
-            seg_color = point_colors[i]
-            fig.add_trace(go.Scatter(
-                x=[ts["report_date"].iloc[i], ts["report_date"].iloc[i+1]],
-                y=[ts["value"].iloc[i], ts["value"].iloc[i+1]],
-                mode="lines",
-                line=dict(color=seg_color, width=2.5, shape="spline"),
-                showlegend=False,
-                hoverinfo="skip",
-            ))
-
-        fig.add_trace(go.Scatter(
-            x=ts["report_date"],
-            y=ts["value"],
-            mode="markers+text",
-            marker=dict(
-                color=point_colors,
-                size=14,
-                line=dict(color=SURFACE, width=3),
-                symbol="circle",
-            ),
-            text=[f"{v:.4g}" for v in ts["value"]],
-            textposition="top center",
-            textfont=dict(color=TEXT, size=11, family="DM Sans"),
-            hovertemplate=f"%{{x|%b %Y}}<br><b>%{{y:.4g}}</b>{unit_label}<extra></extra>",
-            name=test,
-        ))
-
+        unit_label = f" {unit}" if unit else ""
         lo_s = f"{lo:.4g}" if lo is not None else "—"
         hi_s = f"{hi:.4g}" if hi is not None else "—"
         ann_text = (f"Target range: {lo_s} – {hi_s}{unit_label}"
                     if (lo is not None or hi is not None) else "")
 
-        annotations = []
-        if hi is not None:
-            annotations.append(dict(
-                xref="paper", yref="y", x=1.01, y=hi,
-                text="Optimal", showarrow=False,
-                font=dict(color=ACCENT, size=10, family="DM Sans"),
-                xanchor="left",
-            ))
-
-        title_text = f"<b>{test}</b>"
-        if unit:
-            title_text += f"  <span style='font-size:11px;color:{MUTED}'>({unit})</span>"
-
-        fig.update_layout(
-            title=dict(text=title_text, font=dict(color=TEXT, size=15, family="DM Sans"), x=0),
-            paper_bgcolor=SURFACE,
-            plot_bgcolor=SURFACE,
-            font=dict(color=MUTED, family="DM Sans"),
-            xaxis=dict(
-                showgrid=True, gridcolor=BORDER, gridwidth=1,
-                tickformat="%b %Y",
-                tickfont=dict(color=MUTED, size=11, family="DM Sans"),
-                zeroline=False, showline=False,
-            ),
-            yaxis=dict(
-                showgrid=True, gridcolor=BORDER, gridwidth=1,
-                tickfont=dict(color=MUTED, size=11, family="DM Sans"),
-                zeroline=False, showline=False,
-                title=dict(text=unit, font=dict(color=MUTED, size=11)),
-                range=[axis_lo, axis_hi],
-            ),
-            margin=dict(l=50, r=80, t=55, b=50),
-            height=320, showlegend=False, hovermode="x unified",
-            hoverlabel=dict(bgcolor=SURFACE, bordercolor=BORDER,
-                            font=dict(color=TEXT, family="DM Sans")),
-            annotations=annotations,
-        )
-
+        fig = _trend_fig(test, ts, unit, lo, hi, n_min, n_max)
         st.plotly_chart(fig, width="stretch", config={"displayModeBar": False})
 
+        # legend, callout and spacer go out as one markdown element per chart
+        parts = []
         if lo is not None or hi is not None:
-            st.markdown(f"""
-            <div class="range-legend" style="margin-top:0.25rem;margin-bottom:0.5rem">
-              <span class="dot" style="background:{ACCENT}"></span>Optimal range
-              <span class="dot" style="background:{ORANGE};margin-left:12px"></span>High
-              <span class="dot" style="background:{PURPLE};margin-left:12px"></span>Low
-              &nbsp;·&nbsp; <span style="font-size:0.68rem">{ann_text}</span>
-            </div>""", unsafe_allow_html=True)
+            parts.append(_RANGE_LEGEND_HTML.replace("{ann}", ann_text))
 
         has_d = desc   and pd.notna(desc)
         has_i = interp and pd.notna(interp)
         if has_d or has_i:
-            html = '<div class="callout">'
+            parts.append('<div class="callout">')
             if has_d:
-                html += f'<div class="callout-title">What it measures</div><p style="margin:0 0 6px">{desc}</p>'
+                parts.append(f'<div class="callout-title">What it measures</div><p style="margin:0 0 6px">{desc}</p>')
             if has_i:
-                html += f'<div class="callout-title" style="margin-top:6px">Interpretation</div><p style="margin:0">{interp}</p>'
-            html += "</div>"
-            st.markdown(html, unsafe_allow_html=True)
+                parts.append(f'<div class="callout-title" style="margin-top:6px">Interpretation</div><p style="margin:0">{interp}</p>')
+            parts.append("</div>")
 
-        st.markdown('<div style="height:1.5rem"></div>', unsafe_allow_html=True)
+        parts.append('<div style="height:1.5rem"></div>')
+        st.markdown("".join(parts), unsafe_allow_html=True)
 
 
 # ─────────────────────────────────────────────
@@ -1566,6 +1304,8 @@ def render_trend_charts(history: pd.DataFrame, trends: pd.DataFrame, key_prefix:
 # ─────────────────────────────────────────────
 
 def render_change_chart(trends: pd.DataFrame, key_prefix: str = ""):
+    import plotly.graph_objects as go
+
     df = trends.dropna(subset=["first_value", "latest_value"]).copy()
     if df.empty:
         return
@@ -1660,37 +1400,43 @@ def render_change_chart(trends: pd.DataFrame, key_prefix: str = ""):
 # RENDER: TRENDS SECTION
 # ─────────────────────────────────────────────
 
-def render_trends_section(history: pd.DataFrame, trends: pd.DataFrame, key_prefix: str = ""):
+_MOVER_COLS = ["latest_status", "test_name", "trend", "change_%"]
+
+
+# A fragment: picking biomarkers to chart reruns only this section, not the page.
+# A fragment rerun reuses the frames from the last full run, so anything keyed
+# on the store must use the `version` they were loaded with — never a fresh
+# store_version() reading.
+@st.fragment
+def render_trends_section(history: pd.DataFrame, trends: pd.DataFrame, version: tuple,
+                          key_prefix: str = ""):
     if trends.empty:
         st.info("Upload at least 2 reports for this patient to see trends.")
         return
 
-    ab = trends[trends["latest_status"].str.contains("HIGH|LOW", na=False)]
-    worsening = ab[
-        (ab["latest_status"].str.contains("HIGH") & (ab["change_%"] > 0)) |
-        (ab["latest_status"].str.contains("LOW")  & (ab["change_%"] < 0))
-    ]
-    improving = ab[
-        (ab["latest_status"].str.contains("HIGH") & (ab["change_%"] < 0)) |
-        (ab["latest_status"].str.contains("LOW")  & (ab["change_%"] > 0))
-    ]
+    is_high = trends["_is_high"]
+    is_low  = trends["_is_low"]
+    up      = trends["change_%"] > 0
+    down    = trends["change_%"] < 0
+    worsening = trends[(is_high & up)   | (is_low & down)]
+    improving = trends[(is_high & down) | (is_low & up)]
 
     if not worsening.empty:
         with st.expander(f"{len(worsening)} biomarker(s) worsening — abnormal & moving wrong way",
                          expanded=True):
-            for _, r in worsening.iterrows():
+            for status, test, trend, pct in worsening[_MOVER_COLS].itertuples(index=False, name=None):
                 st.markdown(
-                    f"{status_pill(r['latest_status'])} &nbsp;"
-                    f"**{r['test_name']}** — {r['trend']} {abs(r['change_%']):.1f}%",
+                    f"{status_pill(status)} &nbsp;"
+                    f"**{test}** — {trend} {abs(pct):.1f}%",
                     unsafe_allow_html=True,
                 )
 
     if not improving.empty:
         with st.expander(f"{len(improving)} biomarker(s) improving — still abnormal but trending better"):
-            for _, r in improving.iterrows():
+            for status, test, trend, pct in improving[_MOVER_COLS].itertuples(index=False, name=None):
                 st.markdown(
-                    f"{status_pill(r['latest_status'])} &nbsp;"
-                    f"**{r['test_name']}** — {r['trend']} {abs(r['change_%']):.1f}% toward normal",
+                    f"{status_pill(status)} &nbsp;"
+                    f"**{test}** — {trend} {abs(pct):.1f}% toward normal",
                     unsafe_allow_html=True,
                 )
 
@@ -1717,15 +1463,81 @@ def render_trends_section(history: pd.DataFrame, trends: pd.DataFrame, key_prefi
                 unsafe_allow_html=True)
     render_trend_charts(history, trends, key_prefix=key_prefix)
 
-    st.download_button(
-        "↓ Export Trends CSV",
-        data=trends.to_csv(index=False).encode("utf-8"),
-        file_name=f"{safe_name(history)}_trends.csv",
-        mime="text/csv",
-        key=f"{key_prefix}_dl_trends",
+    export_button("↓ Export Trends", trends, (key_prefix, "trends", version),
+                  f"{safe_name(history)}_trends", f"{key_prefix}_dl_trends")
+
+
+# ─────────────────────────────────────────────
+# RENDER: FULL HISTORY TABLE
+# ─────────────────────────────────────────────
+
+@st.fragment
+def render_history_table(pid: str, version: tuple):
+    """
+    Paged Full History table. Only one page of rows is serialised to the
+    browser per run, and paging reruns just this fragment.
+    """
+    hist_view = _cached_history_view(pid, version)
+    n_pages   = max(1, -(-len(hist_view) // _HISTORY_PAGE_ROWS))
+    page_no   = 1
+    if n_pages > 1:
+        page_no = st.number_input(
+            f"Page (of {n_pages} · {len(hist_view)} records)",
+            min_value=1, max_value=n_pages, value=1, step=1,
+            key=f"hist_page_{pid}",
+        )
+    start = (page_no - 1) * _HISTORY_PAGE_ROWS
+    st.dataframe(
+        hist_view.iloc[start:start + _HISTORY_PAGE_ROWS],
+        width="stretch",
+        hide_index=True,
     )
 
 
+# ─────────────────────────────────────────────
+# STATIC PAGES
+# The script body re-executes on every rerun, so static markup is built in a
+# cache_resource function rather than as a module constant.
+# ─────────────────────────────────────────────
+
+@st.cache_resource
+def _about_html() -> str:
+    return f"""
+    <div style="max-width:640px">
+      <div class="section-label">About</div>
+      <p style="color:{TEXT};line-height:1.85;font-size:0.88rem">
+        The <strong>Longitudinal Biomarker Intelligence Platform</strong>
+        extracts structured data from PDF lab reports, flags out-of-range results,
+        and tracks health trends across multiple reports over time.
+      </p>
+      <div class="section-label" style="margin-top:2rem">How it works</div>
+      <p style="color:{MUTED};line-height:1.85;font-size:0.85rem">
+        1. Upload PDF lab reports — patient identity is detected automatically.<br>
+        2. Biomarkers are matched against a dictionary with 75+ canonical names and
+           sex-specific normal ranges.<br>
+        3. Values outside the reference range are flagged HIGH / LOW / CRITICAL.<br>
+        4. Across multiple reports, trend direction, change %, and charts are generated.<br>
+        5. Duplicate uploads are detected by file hash and skipped.<br>
+        6. Claude audits every extraction — catching wrong values, missing units,
+           missed tests, and date errors.
+      </p>
+      <div class="section-label" style="margin-top:2rem">Chart colour guide</div>
+      <p style="color:{MUTED};line-height:1.85;font-size:0.85rem">
+        <span style="color:{ACCENT}">■</span> Teal (Optimized) — value within optimal range<br>
+        <span style="color:{BLUE}">■</span> Blue (Balanced) — within normal range<br>
+        <span style="color:{PURPLE}">■</span> Lavender (Moderate/Low) — below lower limit<br>
+        <span style="color:{ORANGE}">■</span> Coral (Out of Range/High) — above upper limit<br>
+        <span style="color:{CRIT}">■</span> Red — critical danger zone
+      </p>
+      <div class="section-label" style="margin-top:2rem">Privacy</div>
+      <p style="color:{MUTED};line-height:1.85;font-size:0.85rem">
+        All processing is local to the server. Patient profiles are stored as CSV files in
+        <code style="color:{ACCENT}">data/patient_profiles/</code>.
+        Do not commit that directory to a public repository.
+      </p>
+    </div>"""
+
+
 # ─────────────────────────────────────────────
 # API KEY
 # ─────────────────────────────────────────────
@@ -1748,7 +1560,7 @@ llm_enabled = bool(api_key)
 
 with st.sidebar:
     st.markdown('<div class="section-label">Navigation</div>', unsafe_allow_html=True)
-    pending      = load_pending_reviews()
+    pending      = _cached_pending(pending_version())
     review_label = f"🔍 LLM Review  ({len(pending)})" if pending else "🔍 LLM Review"
     page = st.radio(
         "page",
@@ -1760,16 +1572,17 @@ with st.sidebar:
 
     st.markdown("---")
     st.markdown('<div class="section-label">Stored Patients</div>', unsafe_allow_html=True)
-    for p in list_patients():
-        icon = "♂" if str(p.get("gender", "")).upper() == "M" else "♀"
-        st.markdown(
-            f'<div style="font-size:0.82rem;color:{TEXT};margin-bottom:6px;line-height:1.4;'
-            f'padding:6px 8px;border-radius:8px;background:{LIGHT}">'
-            f'{icon} <strong>{p["patient_name"]}</strong>'
-            f'<span style="color:{MUTED};margin-left:8px;font-size:0.72rem">'
-            f'{p["n_reports"]} report(s)</span></div>',
-            unsafe_allow_html=True,
-        )
+    patients = _cached_patients(store_version())      # reused by Patient Profiles below
+    st.markdown("".join(
+        f'<div style="font-size:0.82rem;color:{TEXT};margin-bottom:6px;line-height:1.4;'
+        f'padding:6px 8px;border-radius:8px;background:{LIGHT}">'
+        f'{"♂" if str(p.get("gender", "")).upper() == "M" else "♀"} <strong>{p["patient_name"]}</strong>'
+        f'<span style="color:{MUTED};margin-left:8px;font-size:0.72rem">'
+        f'{p["n_reports"]} report(s)</span></div>'
+        for p in patients
+    ), unsafe_allow_html=True)
+
+    st.radio("Export format", list(_EXPORT_FORMATS), key="export_fmt", horizontal=True)
 
     if llm_enabled:
         st.markdown(f"""
@@ -1824,76 +1637,97 @@ if page == "Upload Reports":
         progress            = st.progress(0)
         results_by_patient: dict = {}
 
-        for i, uf in enumerate(uploaded_files):
-            tmp_path = _make_tmp(uf.read())
+        total               = len(uploaded_files)
+        done                = 0
+        to_extract: dict    = {}     # file hash → (display label, tmp path)
+        batch_dir           = tempfile.TemporaryDirectory(prefix="bip_upload_")
+
+        for uf in uploaded_files:
+            tmp_path = _make_tmp(uf, batch_dir.name)
             label    = f"**{uf.name}**"
+            fh       = file_hash(tmp_path)
 
-            if is_duplicate_file(tmp_path):
+            if fh in to_extract or is_duplicate_file(tmp_path, fh=fh):
                 st.warning(f"⏭️ {label} — already processed, skipping.")
-                progress.progress((i + 1) / len(uploaded_files))
-                continue
-
-            with st.spinner(f"🤖 Claude is reading {uf.name}…"):
-                df, raw_text = process_pdf(tmp_path, api_key=api_key, verbose=False)
-
-            if df.empty:
-                st.warning(
-                    f"⚠️ {label} — extraction failed. "
-                    "Check the PDF is text-based (not a scanned image without OCR support)."
-                )
-                progress.progress((i + 1) / len(uploaded_files))
+                done += 1
+                progress.progress(done / total)
                 continue
+            to_extract[fh] = (label, tmp_path)
+
+        # Extraction is dominated by the Claude round-trip, so files are read
+        # concurrently; saving and all UI output stay on the script thread.
+        with batch_dir, st.spinner(f"🤖 Claude is reading {len(to_extract)} report(s)…"), \
+             ThreadPoolExecutor(max_workers=max(1, min(_UPLOAD_WORKERS, len(to_extract)))) as pool:
+            futures = {
+                pool.submit(process_pdf, tmp_path, api_key=api_key, verbose=False, fh=fh): label
+                for fh, (label, tmp_path) in to_extract.items()
+            }
+            for fut in as_completed(futures):
+                label = futures[fut]
+                done += 1
+                try:
+                    df, raw_text = fut.result()
+                except Exception as e:
+                    # one bad PDF must not discard the rest of the batch
+                    st.warning(f"⚠️ {label} — extraction failed: {e}")
+                    progress.progress(done / total)
+                    continue
+
+                if df.empty:
+                    st.warning(
+                        f"⚠️ {label} — extraction failed. "
+                        "Check the PDF is text-based (not a scanned image without OCR support)."
+                    )
+                    progress.progress(done / total)
+                    continue
 
-            report_date = str(df["report_date"].iloc[0]) if not df.empty else ""
-            ocr_used    = bool(df["ocr_extracted"].iloc[0])
-            pid         = df["patient_id"].iloc[0]
-            name        = df["patient_name"].iloc[0]
-            n_tests     = len(df)
-            known       = df["canonical_name"].notna().sum()
-            unknown     = n_tests - known
+                report_date = str(df["report_date"].iloc[0]) if not df.empty else ""
+                ocr_used    = bool(df["ocr_extracted"].iloc[0])
+                pid         = df["patient_id"].iloc[0]
+                name        = df["patient_name"].iloc[0]
+                n_tests     = len(df)
+                known       = df["canonical_name"].notna().sum()
+                unknown     = n_tests - known
 
-            save_report(df)
+                save_report(df)
 
-            # Success message with extraction summary
-            parts = [f"{n_tests} tests extracted"]
-            if known:    parts.append(f"{known} classified")
-            if unknown:  parts.append(f"{unknown} uncategorised")
-            if not report_date or report_date in ("", "nan", "NaT", "None"):
-                st.warning(f"⚠️ {label} — date not detected. Please check the PDF.")
-                parts.append("⚠️ date missing")
+                # Success message with extraction summary
+                parts = [f"{n_tests} tests extracted"]
+                if known:    parts.append(f"{known} classified")
+                if unknown:  parts.append(f"{unknown} uncategorised")
+                if not report_date or report_date in ("", "nan", "NaT", "None"):
+                    st.warning(f"⚠️ {label} — date not detected. Please check the PDF.")
+                    parts.append("⚠️ date missing")
 
-            st.success(f"✓ {label} — {name} · {' · '.join(parts)}")
+                st.success(f"✓ {label} — {name} · {' · '.join(parts)}")
 
-            if ocr_used:
-                st.caption("📷 OCR was used — verify hormone/thyroid values against the original.")
+                if ocr_used:
+                    st.caption("📷 OCR was used — verify hormone/thyroid values against the original.")
 
-            results_by_patient.setdefault(pid, []).append(df)
-            progress.progress((i + 1) / len(uploaded_files))
+                results_by_patient.setdefault(pid, []).append(df)
+                progress.progress(done / total)
 
         if results_by_patient:
             st.markdown("---")
             for pid in results_by_patient:
-                history = load_history(pid)
-                trends  = generate_trends(history)
-                render_patient_card(history)
+                version = store_version()
+                history = _cached_history(pid, version)
+                trends  = _cached_trends(pid, version)
+                meta    = _patient_meta(history)
+                render_patient_card(pid, version)
                 tab1, tab2 = st.tabs(["Latest Results", "Trends"])
                 with tab1:
-                    snapshot = get_snapshot(history)
+                    snapshot = _cached_snapshot(pid, version)
                     render_radial_overview(snapshot, filter_status="all")
                     st.markdown(
                         f'<hr style="border:none;border-top:1px solid {BORDER};margin:0.75rem 0">',
                         unsafe_allow_html=True
                     )
                     render_results_table(snapshot, table_key=f"upload_{pid}")
-                    st.download_button(
-                        "↓ Export CSV",
-                        data=snapshot.to_csv(index=False).encode("utf-8"),
-                        file_name=f"{safe_name(history)}_latest.csv",
-                        mime="text/csv",
-                        key=f"ul_snap_{pid}",
-                    )
+                    export_button("↓ Export", snapshot, (pid, "latest", version),
+                                  f"{safe_name(history, meta)}_latest", f"ul_snap_{pid}")
                 with tab2:
-                    render_trends_section(history, trends, key_prefix=f"ul_{pid}")
+                    render_trends_section(history, trends, version, key_prefix=f"ul_{pid}")
                 st.markdown("---")
 
     elif not uploaded_files:
@@ -1912,7 +1746,6 @@ if page == "Upload Reports":
 
 elif page == "Patient Profiles":
     st.markdown('<div class="section-label">Stored Patient Profiles</div>', unsafe_allow_html=True)
-    patients = list_patients()
 
     if not patients:
         st.info("No patient profiles yet — upload some lab reports first.")
@@ -1926,19 +1759,21 @@ elif page == "Patient Profiles":
             label_visibility="collapsed",
         )
         selected_pid = patient_options[selected_label]
-        history      = load_history(selected_pid)
+        store_ver    = store_version()
+        history      = _cached_history(selected_pid, store_ver)
 
         if history.empty:
             st.error("Could not load this patient's profile.")
         else:
-            render_patient_card(history)
-            report_dates = sorted(
-                history["report_date"].dropna().dt.strftime("%Y-%m-%d").unique(),
-                reverse=True,
-            )
+            meta = _patient_meta(history)
+            render_patient_card(selected_pid, store_ver)
+            # day -> tests dict is keyed in ascending day order; both date
+            # selectors and the edit form's test list come from this one cache
+            date_tests_by_day = _cached_date_tests(selected_pid, store_ver)
+            report_dates      = list(reversed(date_tests_by_day))
 
             with st.expander("Manage Patient Data", expanded=False):
-                current_name = history["patient_name"].iloc[0]
+                current_name = meta["name"]
 
                 st.markdown('<div class="section-label">Rename</div>', unsafe_allow_html=True)
                 cn1, cn2, _ = st.columns([3, 1, 3])
@@ -2004,23 +1839,23 @@ elif page == "Patient Profiles":
                 st.warning(f"This will permanently erase all data for **{current_name}**.")
                 if st.button("⛔ Delete Patient", key="del_patient_btn"):
                     # Clear all pending LLM reviews for this patient first
-                    for review in load_pending_reviews():
-                        if review.get("patient_id") == selected_pid:
-                            delete_pending_review(selected_pid, review.get("report_date", ""))
+                    delete_pending_reviews([(selected_pid, r.get("report_date", ""))
+                                            for r in pending
+                                            if r.get("patient_id") == selected_pid])
                     delete_patient(selected_pid)
                     st.success("Deleted.")
                     st.rerun()
 
-            trends = generate_trends(history)
+            trends = _cached_trends(selected_pid, store_ver)
             tab1, tab2, tab3 = st.tabs(["Latest Results", "Trends", "Full History"])
 
             with tab1:
-                snapshot = get_snapshot(history)
+                snapshot = _cached_snapshot(selected_pid, store_ver)
 
                 # ── Overview stats ──────────────────────────────────────────
                 total    = len(snapshot)
-                critical = snapshot["status"].str.contains("CRITICAL", na=False).sum()
-                abnormal = snapshot["status"].str.contains("HIGH|LOW", na=False).sum()
+                critical = snapshot["_is_crit"].sum()
+                abnormal = snapshot["_abnormal"].sum()
                 normal   = total - abnormal
                 oor      = abnormal - critical
                 pct_ok   = int(normal / total * 100) if total else 0
@@ -2201,35 +2036,17 @@ elif page == "Patient Profiles":
                     )
                     st.markdown("</div>", unsafe_allow_html=True)
 
-                st.download_button(
-                    "↓ Export Latest CSV",
-                    data=snapshot.to_csv(index=False).encode("utf-8"),
-                    file_name=f"{safe_name(history)}_latest.csv",
-                    mime="text/csv",
-                    key=f"pp_snap_{selected_pid}",
-                )
+                export_button("↓ Export Latest", snapshot, (selected_pid, "latest", store_ver),
+                              f"{safe_name(history, meta)}_latest", f"pp_snap_{selected_pid}")
 
             with tab2:
-                render_trends_section(history, trends, key_prefix=f"pp_{selected_pid}")
+                render_trends_section(history, trends, store_ver, key_prefix=f"pp_{selected_pid}")
 
             with tab3:
                 st.markdown('<div class="section-label">All Records</div>', unsafe_allow_html=True)
-                show_cols = ["report_date", "test_name", "value", "unit", "status", "source_file"]
-                avail     = [c for c in show_cols if c in history.columns]
-                disp      = history[avail].copy()
-                disp["unit"] = disp["unit"].apply(clean_unit)
-                st.dataframe(
-                    disp.sort_values(["report_date", "test_name"], ascending=[False, True]),
-                    width="stretch",
-                    hide_index=True,
-                )
-                st.download_button(
-                    "↓ Full History CSV",
-                    data=history.to_csv(index=False).encode("utf-8"),
-                    file_name=f"{safe_name(history)}_full_history.csv",
-                    mime="text/csv",
-                    key=f"pp_hist_{selected_pid}",
-                )
+                render_history_table(selected_pid, store_ver)
+                export_button("↓ Full History", history, (selected_pid, "history", store_ver),
+                              f"{safe_name(history, meta)}_full_history", f"pp_hist_{selected_pid}")
 
                 st.markdown("---")
                 st.markdown(
@@ -2246,46 +2063,48 @@ elif page == "Patient Profiles":
                     edit_date = st.selectbox("Report date", options=report_dates,
                                              key=f"edit_date_{selected_pid}")
                 with ec2:
-                    date_tests = sorted(
-                        history[history["report_date"].dt.strftime("%Y-%m-%d") == edit_date
-                               ]["test_name"].unique().tolist()
-                    )
+                    date_tests = date_tests_by_day.get(edit_date, [])
                     edit_test = st.selectbox("Test to correct", options=date_tests,
                                              key=f"edit_test_{selected_pid}")
 
-                cur_row  = history[
-                    (history["report_date"].dt.strftime("%Y-%m-%d") == edit_date) &
-                    (history["test_name"] == edit_test)
-                ]
-                cur_val  = float(cur_row["value"].iloc[0]) if not cur_row.empty else 0.0
-                cur_unit = clean_unit(cur_row["unit"].iloc[0] if not cur_row.empty else "")
-
+                cur_rec  = (_cached_edit_records(selected_pid, store_ver)
+                            .get((edit_date, edit_test), {"value": 0.0, "unit": ""}))
+                cur_val  = float(cur_rec["value"])
+                cur_unit = cur_rec["unit"]
+
+                # The write runs in the Save callback, i.e. before the rerun the
+                # click triggers, so that rerun already reads the new store
+                # version — no follow-up st.rerun() needed.
+                def _save_edit(pid: str, day: str, test: str, old_val: float, old_unit: str) -> None:
+                    sfx      = f"{pid}_{day}_{test}"
+                    new_val  = st.session_state[f"edit_val_{sfx}"]
+                    new_unit = st.session_state[f"edit_unit_{sfx}"].strip()
+                    if abs(new_val - old_val) <= 1e-6 and new_unit == old_unit.strip():
+                        st.toast("No change detected.")
+                    elif patch_record(pid, day, test, new_value=new_val, new_unit=new_unit):
+                        st.toast(f"✓ **{test}** → {new_val:.4g} {new_unit}")
+                    else:
+                        st.toast("Record not found.")
+
+                edit_sfx = f"{selected_pid}_{edit_date}_{edit_test}"
                 vc, uc, bc = st.columns([2, 2, 1])
                 with vc:
-                    new_val = st.number_input(
+                    st.number_input(
                         f"Value  (stored: {cur_val:.4g})",
                         value=cur_val, format="%.4f",
-                        key=f"edit_val_{selected_pid}_{edit_date}_{edit_test}",
+                        key=f"edit_val_{edit_sfx}",
                     )
                 with uc:
-                    new_unit = st.text_input(
+                    st.text_input(
                         f"Unit  (stored: {cur_unit or '—'})",
                         value=cur_unit,
-                        key=f"edit_unit_{selected_pid}_{edit_date}_{edit_test}",
+                        key=f"edit_unit_{edit_sfx}",
                     )
                 with bc:
                     st.markdown("<div style='margin-top:1.75rem'></div>", unsafe_allow_html=True)
-                    if st.button("💾 Save", key=f"edit_save_{selected_pid}_{edit_date}_{edit_test}"):
-                        if abs(new_val - cur_val) > 1e-6 or new_unit.strip() != cur_unit.strip():
-                            ok = patch_record(selected_pid, edit_date, edit_test,
-                                              new_value=new_val, new_unit=new_unit.strip())
-                            if ok:
-                                st.success(f"✓ **{edit_test}** → {new_val:.4g} {new_unit.strip()}")
-                                st.rerun()
-                            else:
-                                st.error("Record not found.")
-                        else:
-                            st.info("No change detected.")
+                    st.button("💾 Save", key=f"edit_save_{edit_sfx}",
+                              on_click=_save_edit,
+                              args=(selected_pid, edit_date, edit_test, cur_val, cur_unit))
 
 
 # ═══════════════════════════════════════════════
@@ -2300,65 +2119,44 @@ elif page == "LLM Review":
         "individual values.  \nThis page shows any reports you've manually flagged for review."
     )
 
-    pending = load_pending_reviews()
-
+    # pending is the sidebar's cached list — a dismiss callback changes the
+    # file signature before this rerun, so it is never stale here
     if not pending:
         st.success("✓ No pending reviews.")
     else:
-        for review in pending:
-            pid         = review["patient_id"]
-            report_date = review.get("report_date", "")
-            note        = review.get("note", "")
-
-            history      = load_history(pid)
-            patient_name = history["patient_name"].iloc[0] if not history.empty else pid
-
-            with st.expander(f"📋  {patient_name}  ·  {report_date}", expanded=True):
-                if note:
-                    st.info(note)
-
-                col_dismiss, _ = st.columns([1, 4])
-                with col_dismiss:
-                    if st.button("✓ Dismiss", key=f"dismiss_{pid}_{report_date}", type="primary"):
-                        delete_pending_review(pid, report_date)
-                        st.rerun()
+        # One form for every review: ticking boxes doesn't rerun the page, and
+        # all chosen dismissals are written to the review file in one go. The
+        # write happens in the submit callback, i.e. before the rerun the
+        # submit triggers, so that rerun already shows the trimmed list (and
+        # sidebar count) without a second st.rerun().
+        def _dismiss_checked(keys: list) -> None:
+            delete_pending_reviews([k for k in keys
+                                    if st.session_state.get(f"dismiss_{k[0]}_{k[1]}")])
+
+        names = {p["patient_id"]: p["patient_name"] for p in patients}
+
+        with st.form("dismiss_reviews"):
+            for review in pending:
+                pid         = review["patient_id"]
+                report_date = review.get("report_date", "")
+                note        = review.get("note", "")
+
+                patient_name = names.get(pid) or pid
+
+                with st.expander(f"📋  {patient_name}  ·  {report_date}", expanded=True):
+                    if note:
+                        st.info(note)
+                    st.checkbox("Dismiss", key=f"dismiss_{pid}_{report_date}")
+
+            st.form_submit_button(
+                "✓ Dismiss selected", type="primary",
+                on_click=_dismiss_checked,
+                args=([(r["patient_id"], r.get("report_date", "")) for r in pending],),
+            )
 
 # ═══════════════════════════════════════════════
 # PAGE: ABOUT
 # ═══════════════════════════════════════════════
 
 elif page == "About":
-    st.markdown(f"""
-    <div style="max-width:640px">
-      <div class="section-label">About</div>
-      <p style="color:{TEXT};line-height:1.85;font-size:0.88rem">
-        The <strong>Longitudinal Biomarker Intelligence Platform</strong>
-        extracts structured data from PDF lab reports, flags out-of-range results,
-        and tracks health trends across multiple reports over time.
-      </p>
-      <div class="section-label" style="margin-top:2rem">How it works</div>
-      <p style="color:{MUTED};line-height:1.85;font-size:0.85rem">
-        1. Upload PDF lab reports — patient identity is detected automatically.<br>
-        2. Biomarkers are matched against a dictionary with 75+ canonical names and
-           sex-specific normal ranges.<br>
-        3. Values outside the reference range are flagged HIGH / LOW / CRITICAL.<br>
-        4. Across multiple reports, trend direction, change %, and charts are generated.<br>
-        5. Duplicate uploads are detected by file hash and skipped.<br>
-        6. Claude audits every extraction — catching wrong values, missing units,
-           missed tests, and date errors.
-      </p>
-      <div class="section-label" style="margin-top:2rem">Chart colour guide</div>
-      <p style="color:{MUTED};line-height:1.85;font-size:0.85rem">
-        <span style="color:{ACCENT}">■</span> Teal (Optimized) — value within optimal range<br>
-        <span style="color:{BLUE}">■</span> Blue (Balanced) — within normal range<br>
-        <span style="color:{PURPLE}">■</span> Lavender (Moderate/Low) — below lower limit<br>
-        <span style="color:{ORANGE}">■</span> Coral (Out of Range/High) — above upper limit<br>
-        <span style="color:{CRIT}">■</span> Red — critical danger zone
-      </p>
-      <div class="section-label" style="margin-top:2rem">Privacy</div>
-      <p style="color:{MUTED};line-height:1.85;font-size:0.85rem">
-        All processing is local to the server. Patient profiles are stored as CSV files in
-        <code style="color:{ACCENT}">data/patient_profiles/</code>.
-        Do not commit that directory to a public repository.
-      </p>
-    </div>""", unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(_about_html(), unsafe_allow_html=True)
\ No newline at end of file
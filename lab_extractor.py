@@ -3,7 +3,7 @@ Longitudinal Biomarker Intelligence Platform
 lab_extractor.py  —  v6  (Phase 1: LLM-first extraction + SQLite)
 
 Pipeline per PDF:
-  1. pdfplumber → raw text  (OCR fallback if text < 80 words)
+  1. PyMuPDF (or pdfplumber) → raw text  (OCR fallback if text < 80 words)
   2. Claude Haiku → structured JSON  {patient, tests[]}
   3. Regex validation  (numeric values, date parsing, unit normalisation)
   4. Dictionary enrichment:
@@ -20,8 +20,10 @@ Removed vs v5:
 
 import re
 import json
+import pickle
 import hashlib
 import sqlite3
+import threading
 import pdfplumber
 import pandas as pd
 import anthropic
@@ -37,10 +39,18 @@ try:
 except ImportError:
     _OCR_AVAILABLE = False
 
+# ── Fast text layer (PyMuPDF); pdfplumber stays as the fallback ───────────────
+try:
+    import pymupdf as _pymupdf
+    _PYMUPDF_AVAILABLE = True
+except ImportError:
+    _PYMUPDF_AVAILABLE = False
+
 # ── Paths ──────────────────────────────────────────────────────────────────────
 BASE_DIR  = Path(__file__).parent
 DATA_DIR  = BASE_DIR / "data"
 DICT_PATH = DATA_DIR / "Biomarker_dictionary_csv.csv"
+DICT_CACHE = DATA_DIR / ".biomarker_dictionary.pkl"   # parsed DICT_PATH, rebuilt on change
 DB_PATH   = DATA_DIR / "biomarker.db"
 
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -90,22 +100,30 @@ CREATE INDEX IF NOT EXISTS idx_br_date    ON biomarker_records(report_date);
 CREATE INDEX IF NOT EXISTS idx_br_hash    ON biomarker_records(file_hash);
 """
 
+_local = threading.local()      # per-thread SQLite connection, see _db()
+
 
 @contextmanager
 def _db():
-    """Yield a committed SQLite connection; rollback on exception."""
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    """
+    Yield this thread's SQLite connection; commit on success, rollback on
+    exception. The connection is opened once per thread and reused, so a
+    rerun that touches the store several times pays the connect + PRAGMA
+    cost once. It is closed when the thread's locals are released.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn = conn
     try:
         yield conn
         conn.commit()
     except Exception:
         conn.rollback()
         raise
-    finally:
-        conn.close()
 
 
 def _init_db():
@@ -164,15 +182,40 @@ def _safe_float(v):
         return None
 
 
+# '4.0-11.0' / '4.0–11.0'  or  '<200' / '<=5' / '>40' / '>=3.5'
+_RANGE_RE = re.compile(
+    r"^\s*(?:(?P<lo>\d+\.?\d*)\s*[-\u2013]\s*(?P<hi>\d+\.?\d*)"
+    r"|(?P<op>[<>]=?)\s*(?P<num>\d+\.?\d*))\s*$"
+)
+
+
+def _parse_range_series(s: pd.Series) -> tuple:
+    """Vectorised _parse_range over a column. Returns (low, high) float Series, NaN = open."""
+    m   = s.astype("string").str.extract(_RANGE_RE)
+    num = pd.to_numeric(m["num"], errors="coerce")
+    lo  = pd.to_numeric(m["lo"], errors="coerce")
+    hi  = pd.to_numeric(m["hi"], errors="coerce")
+    lo  = lo.fillna(num.where(m["op"].str.startswith(">", na=False)))
+    hi  = hi.fillna(num.where(m["op"].str.startswith("<", na=False)))
+    return lo, hi
+
+
 def _load_dictionary(path: Path) -> dict:
     """
     Returns {canonical_name: {unit, category, sex_rows[], zone range floats,
                                short_description, interpretation_summary}}
+    Each sex_row carries its normal_range pre-parsed into lo/hi floats.
     """
     try:
-        df = pd.read_csv(path, encoding="latin1")
+        df = pd.read_csv(path, encoding="utf-8")
     except FileNotFoundError:
         return {}
+    except UnicodeDecodeError:
+        # hand-edited copies saved from Excel on Windows come out as cp1252
+        df = pd.read_csv(path, encoding="latin1")
+
+    # Parse every normal_range in one pass instead of per flag_status() call
+    df["_range_lo"], df["_range_hi"] = _parse_range_series(df["normal_range"])
 
     biomarkers = {}
     for _, row in df.iterrows():
@@ -198,12 +241,48 @@ def _load_dictionary(path: Path) -> dict:
         biomarkers[canonical]["sex_rows"].append({
             "sex":          str(row.get("sex", "both")).strip().lower(),
             "normal_range": str(row.get("normal_range", "")).strip(),
+            "lo":           _safe_float(row["_range_lo"]),
+            "hi":           _safe_float(row["_range_hi"]),
         })
     return biomarkers
 
 
+# Bump when _load_dictionary's output shape changes so stale pickles are rebuilt
+_DICT_CACHE_VERSION = 3
+
+
+def _load_dictionary_cached(path: Path, cache: Path) -> dict:
+    """
+    _load_dictionary() behind a pickle sidecar keyed on a hash of the CSV bytes
+    (mtimes don't survive a fresh clone or container rebuild; the content does).
+    Warm starts unpickle the parsed dict instead of re-parsing the CSV;
+    a missing, stale or unreadable cache falls back to the CSV and is rewritten.
+    """
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return {}
+    sig = (_DICT_CACHE_VERSION, hashlib.sha256(raw).hexdigest())
+
+    try:
+        with open(cache, "rb") as f:
+            cached_sig, biomarkers = pickle.load(f)
+        if cached_sig == sig:
+            return biomarkers
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        pass
+
+    biomarkers = _load_dictionary(path)
+    try:
+        with open(cache, "wb") as f:
+            pickle.dump((sig, biomarkers), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass   # read-only deploy — just parse the CSV each start
+    return biomarkers
+
+
 # Loaded once at import — ~131 entries, negligible memory
-BIOMARKERS: dict = _load_dictionary(DICT_PATH)
+BIOMARKERS: dict = _load_dictionary_cached(DICT_PATH, DICT_CACHE)
 
 # Sorted canonical names embedded verbatim in the LLM prompt
 _CANONICAL_LIST: str = "\n".join(f"  - {n}" for n in sorted(BIOMARKERS))
@@ -213,17 +292,15 @@ _CANONICAL_LIST: str = "\n".join(f"  - {n}" for n in sorted(BIOMARKERS))
 
 def _parse_range(s: str) -> tuple:
     """Parse '4.0-11.0', '<200', '>=3.5' into (low, high) floats."""
-    s = str(s).strip()
-    if not s or s in ("nan", "none", "None", ""):
+    # One match against the same pattern the dictionary loader uses — the
+    # named group that fired says which form it was, no prefix probing
+    m = _RANGE_RE.match(str(s))
+    if not m:
         return None, None
-    m = re.match(r"^(\d+\.?\d*)\s*[-\u2013]\s*(\d+\.?\d*)$", s)
-    if m:
-        return float(m.group(1)), float(m.group(2))
-    if s.startswith(">="):  return float(s[2:]), None
-    if s.startswith("<="):  return None, float(s[2:])
-    if s.startswith(">"):   return float(s[1:]),  None
-    if s.startswith("<"):   return None,  float(s[1:])
-    return None, None
+    if m["lo"] is not None:
+        return float(m["lo"]), float(m["hi"])
+    num = float(m["num"])
+    return (num, None) if m["op"][0] == ">" else (None, num)
 
 
 def _convert(value: float, from_unit: str, to_unit: str) -> float:
@@ -253,7 +330,7 @@ def flag_status(test_name: str, value: float, unit: str,
             matched = bm["sex_rows"][0]
         if matched:
             val = _convert(value, unit, bm["unit"])
-            lo, hi = _parse_range(matched["normal_range"])
+            lo, hi = matched["lo"], matched["hi"]
             if lo is not None and val < lo: return "LOW ⬇"
             if hi is not None and val > hi: return "HIGH ⬆"
             return "Normal"
@@ -489,8 +566,9 @@ def file_hash(path: Path) -> str:
     return h.hexdigest()
 
 
-def is_duplicate_file(path: Path) -> bool:
-    fh = file_hash(path)
+def is_duplicate_file(path: Path, fh: str = None) -> bool:
+    """fh: the file's hash if the caller already has it — skips re-reading the file."""
+    fh = fh or file_hash(path)
     with _db() as conn:
         row = conn.execute(
             "SELECT 1 FROM biomarker_records WHERE file_hash = ? LIMIT 1", (fh,)
@@ -502,10 +580,30 @@ def is_duplicate_file(path: Path) -> bool:
 # MAIN PIPELINE
 # =============================================================================
 
-def process_pdf(pdf_path, api_key: str, verbose: bool = False) -> tuple:
+def _pdf_text(pdf_path: Path) -> tuple:
+    """
+    Text layer of every page — PyMuPDF when installed, else pdfplumber.
+    Returns (text, backend) where backend names the library that produced it.
+    """
+    if _PYMUPDF_AVAILABLE:
+        try:
+            with _pymupdf.open(pdf_path) as doc:
+                return "\n".join(page.get_text("text") for page in doc), "pymupdf"
+        except Exception:
+            pass   # damaged/unusual file — let pdfplumber have a go
+    pages_text = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            t = page.extract_text(x_tolerance=2, y_tolerance=2) or ""
+            pages_text.append(t)
+    return "\n".join(pages_text), "pdfplumber"
+
+
+def process_pdf(pdf_path, api_key: str, verbose: bool = False, fh: str = None) -> tuple:
     """
     Full pipeline: PDF → validated DataFrame + raw text.
     Returns (df, raw_text). df is empty on any failure.
+    fh: precomputed file_hash, if the caller already has one.
 
     DataFrame columns (same shape as v5, so app.py UI is unchanged):
       patient_id, patient_name, gender, age_at_test, birth_year, report_date,
@@ -514,13 +612,8 @@ def process_pdf(pdf_path, api_key: str, verbose: bool = False) -> tuple:
     """
     pdf_path = Path(pdf_path)
 
-    # Step 1: pdfplumber
-    pages_text = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            t = page.extract_text(x_tolerance=2, y_tolerance=2) or ""
-            pages_text.append(t)
-    full_text = "\n".join(pages_text)
+    # Step 1: text layer
+    full_text, backend = _pdf_text(pdf_path)
 
     # Step 2: OCR fallback (unchanged from v5)
     ocr_used = False
@@ -536,7 +629,7 @@ def process_pdf(pdf_path, api_key: str, verbose: bool = False) -> tuple:
             pass
 
     if verbose:
-        mode = "[OCR]" if ocr_used else "[pdfplumber]"
+        mode = "[OCR]" if ocr_used else f"[{backend}]"
         print(f"  {pdf_path.name}: {len(full_text.split())} words {mode}")
 
     # Step 3: LLM extraction
@@ -556,7 +649,7 @@ def process_pdf(pdf_path, api_key: str, verbose: bool = False) -> tuple:
         return pd.DataFrame(), full_text
 
     # Step 5: Enrich with dictionary + compute status
-    fh          = file_hash(pdf_path)
+    fh          = fh or file_hash(pdf_path)
     report_date = data["report_date"]
     gender      = data["gender"]
     age         = data["age"]
@@ -687,7 +780,13 @@ def save_report(df: pd.DataFrame) -> None:
 # =============================================================================
 
 def load_history(patient_id: str) -> pd.DataFrame:
-    """Load all records for a patient as a DataFrame (report_date as datetime)."""
+    """
+    Load all records for a patient as a DataFrame (report_date as datetime).
+    Also carries _date_str: the report day as a 'YYYY-MM-DD' category, so
+    callers can list or match report dates without re-running strftime.
+    test_name and status are categoricals too — a few dozen distinct strings
+    repeated across every report, so equality filters compare codes.
+    """
     with _db() as conn:
         patient = conn.execute(
             "SELECT * FROM patients WHERE patient_id = ?", (patient_id,)
@@ -703,6 +802,9 @@ def load_history(patient_id: str) -> pd.DataFrame:
 
     df = pd.DataFrame([dict(r) for r in rows])
     df["report_date"] = pd.to_datetime(df["report_date"], errors="coerce")
+    df["_date_str"]   = df["report_date"].dt.strftime("%Y-%m-%d").astype("category")
+    df["test_name"]   = df["test_name"].astype("category")
+    df["status"]      = df["status"].astype("category")
 
     if patient:
         df["patient_name"] = patient["patient_name"]
@@ -716,6 +818,22 @@ def load_history(patient_id: str) -> pd.DataFrame:
     return df
 
 
+def store_version() -> tuple:
+    """
+    Cheap change token for the SQLite store: (mtime_ns, size) of the database
+    file and its WAL. Every committed write moves one of them, so UI caches can
+    key on this instead of re-querying to find out whether anything changed.
+    """
+    sig = []
+    for p in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal")):
+        try:
+            st = p.stat()
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
 def list_patients() -> list:
     """Single SQL query — O(1) regardless of patient count."""
     with _db() as conn:
@@ -823,7 +941,7 @@ def patch_record(patient_id: str, report_date: str, test_name: str,
 
 def generate_trends(history: pd.DataFrame) -> pd.DataFrame:
     rows = []
-    for test, group in history.groupby("test_name"):
+    for test, group in history.groupby("test_name", observed=True):
         group = (group.dropna(subset=["report_date"])
                       .sort_values("report_date")
                       .drop_duplicates("report_date"))
@@ -60,9 +60,28 @@ def load_pending_reviews() -> list:
     return _load_raw()
 
 
+def pending_version() -> tuple | None:
+    """(mtime_ns, size) of the pending-review file — changes on every save/delete."""
+    try:
+        st = _PENDING_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 def delete_pending_review(patient_id: str, report_date: str) -> None:
     records = _load_raw()
     records = [r for r in records
                if not (r["patient_id"] == patient_id
                        and str(r.get("report_date", ""))[:10] == str(report_date)[:10])]
-    _save_raw(records)
\ No newline at end of file
+    _save_raw(records)
+
+
+def delete_pending_reviews(keys) -> None:
+    """Remove several (patient_id, report_date) reviews with one read and one write."""
+    drop = {(pid, str(d)[:10]) for pid, d in keys}
+    if not drop:
+        return
+    records = [r for r in _load_raw()
+               if (r["patient_id"], str(r.get("report_date", ""))[:10]) not in drop]
+    _save_raw(records)